@@ -0,0 +1,140 @@
+"""
+Asyncio front ends for InvoiceDAO and PaymentProcessor.
+
+sqlite3 has no async driver, so each call still runs on a thread, but every
+call goes through one DatabaseExecutor per connection pool: a fixed-size
+thread pool plus a semaphore that caps calls in flight. Thousands of
+concurrent requests then wait cheaply on the semaphore inside the event loop
+instead of each claiming a thread, and the thread count never exceeds the
+number of pooled connections. The async classes wrap the sync ones, so
+validation, caching and transaction behaviour are identical.
+"""
+
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from db_pool import ConnectionPool
+from invoice_dao import InvoiceDAO, SEARCH_PAGE_SIZE
+from invoice_rows import InvoiceRow, InvoiceSearchRow
+from payment_processor import PaymentProcessor, PaymentResult, DEFAULT_BATCH_SIZE
+
+
+class DatabaseExecutor:
+    def __init__(self, max_workers: int, max_in_flight: Optional[int] = None):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="billing-db")
+        self.max_in_flight = max_in_flight or max_workers
+        # Callers beyond max_in_flight wait in the event loop, not in the executor
+        # queue. asyncio primitives belong to one loop, so keep one per loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _in_flight(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_in_flight)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        async with self._in_flight():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_executors: "weakref.WeakKeyDictionary[ConnectionPool, DatabaseExecutor]" = weakref.WeakKeyDictionary()
+_executors_lock = threading.Lock()
+
+
+def get_database_executor(pool: ConnectionPool) -> DatabaseExecutor:
+    """One executor per pool, sized to its connections, shared by all async wrappers."""
+    with _executors_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            executor = DatabaseExecutor(pool.max_size)
+            _executors[pool] = executor
+        return executor
+
+
+class AsyncInvoiceDAO:
+    def __init__(self, dao: Optional[InvoiceDAO] = None,
+                 executor: Optional[DatabaseExecutor] = None):
+        self.dao = dao or InvoiceDAO()
+        self.executor = executor or get_database_executor(self.dao.pool)
+
+    async def get_invoice(self, invoice_id: str) -> Optional[InvoiceRow]:
+        return await self.executor.run(self.dao.get_invoice, invoice_id)
+
+    async def get_invoices_by_customer(self, customer_id: str) -> List[InvoiceRow]:
+        return await self.executor.run(self.dao.get_invoices_by_customer, customer_id)
+
+    async def get_invoices_by_customers(self, customer_ids: Iterable[str]) -> Dict[str, List[InvoiceRow]]:
+        return await self.executor.run(self.dao.get_invoices_by_customers, list(customer_ids))
+
+    async def get_outstanding_balance(self, customer_id: str) -> float:
+        return await self.executor.run(self.dao.get_outstanding_balance, customer_id)
+
+    async def get_late_invoice_count(self, customer_id: str) -> int:
+        return await self.executor.run(self.dao.get_late_invoice_count, customer_id)
+
+    async def get_used_credit(self, customer_id: str) -> float:
+        return await self.executor.run(self.dao.get_used_credit, customer_id)
+
+    async def get_invoice_summary(self, customer_id: str) -> Dict:
+        # Cache hits don't touch the database, so skip the executor for them;
+        # a miss goes straight to the query so it is counted once
+        cached = self.dao.summary_cache.get(customer_id)
+        if cached is not None:
+            return cached
+        return await self.executor.run(self.dao.query_invoice_summary, customer_id)
+
+    async def get_invoice_summaries(self, customer_ids: Iterable[str]) -> Dict[str, Dict]:
+        return await self.executor.run(self.dao.get_invoice_summaries, list(customer_ids))
+
+    async def create_invoice(self, customer_id: str, amount: float, status: str) -> bool:
+        return await self.executor.run(self.dao.create_invoice, customer_id, amount, status)
+
+    async def update_invoice_status(self, invoice_id: str, new_status: str) -> bool:
+        return await self.executor.run(self.dao.update_invoice_status, invoice_id, new_status)
+
+    async def delete_invoice(self, invoice_id: str) -> bool:
+        return await self.executor.run(self.dao.delete_invoice, invoice_id)
+
+    async def search_invoices(self, customer_name: str, status: str,
+                              min_amount: float, max_amount: float) -> List[InvoiceSearchRow]:
+        return await self.executor.run(
+            self.dao.search_invoices, customer_name, status, min_amount, max_amount)
+
+    async def search_invoices_page(self, customer_name: str, status: str,
+                                   min_amount: float, max_amount: float,
+                                   after: Optional[int] = None,
+                                   page_size: int = SEARCH_PAGE_SIZE) -> Tuple[List[InvoiceSearchRow], Optional[int]]:
+        return await self.executor.run(
+            self.dao.search_invoices_page, customer_name, status, min_amount, max_amount,
+            after, page_size)
+
+
+class AsyncPaymentProcessor:
+    def __init__(self, processor: Optional[PaymentProcessor] = None,
+                 executor: Optional[DatabaseExecutor] = None):
+        self.processor = processor or PaymentProcessor()
+        self.executor = executor or get_database_executor(self.processor.pool)
+
+    async def process_payment(self, customer_id: str, amount: float, method: str,
+                              metadata: Dict[str, str]) -> bool:
+        return await self.executor.run(
+            self.processor.process_payment, customer_id, amount, method, metadata)
+
+    async def process_payments(self, payments: Iterable, batch_size: int = DEFAULT_BATCH_SIZE,
+                               notify: bool = True) -> List[PaymentResult]:
+        # The iterable is consumed on the worker thread, keeping streaming validation
+        return await self.executor.run(self.processor.process_payments, payments, batch_size, notify)
@@ -0,0 +1,274 @@
+"""
+Runtime latency metrics for the billing modules.
+
+InvoiceDAO and PaymentProcessor methods are wrapped with @timed, and every
+pooled connection reports its statements through sqlite3's trace callback
+(see QueryTimer), so each method and each distinct SQL statement gets a
+latency histogram. Histograms use fixed log-spaced buckets: memory per
+series is constant however many calls are recorded, and the number of
+series is capped, so memory stays bounded. The time cost is dominated by
+turning each traced statement back into its parameterized form: about
+15-20us per DAO call, against query times in the 20us..ms range.
+
+dump() writes a runtime_metrics.json snapshot, which
+scripts/analyze_code_health.py merges into metrics.json for the dashboard's
+"Slowest Operations" panel. Set BILLING_METRICS=0 to turn collection off,
+or BILLING_METRICS_FILE to dump automatically when the process exits.
+"""
+
+import atexit
+import functools
+import json
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+RUNTIME_METRICS_FILE = "runtime_metrics.json"
+# Distinct method/statement series kept per kind; later ones share one series
+MAX_SERIES = 256
+OVERFLOW_SERIES = "(other)"
+MAX_LABEL_LENGTH = 200
+
+# Buckets cover 1us..~134s; eight per doubling keeps percentiles within ~9%
+MIN_SECONDS = 1e-6
+BUCKETS_PER_OCTAVE = 8
+OCTAVES = 27
+
+
+class LatencyHistogram:
+    def __init__(self):
+        # Bucket 0 holds everything up to MIN_SECONDS; the last one is open-ended
+        self._counts = [0] * (OCTAVES * BUCKETS_PER_OCTAVE + 2)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def bucket(seconds: float) -> int:
+        if seconds <= MIN_SECONDS:
+            return 0
+        index = math.ceil(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_OCTAVE)
+        return min(index, OCTAVES * BUCKETS_PER_OCTAVE + 1)
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        return MIN_SECONDS * 2 ** (index / BUCKETS_PER_OCTAVE)
+
+    def record(self, seconds: float):
+        index = self.bucket(seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th percentile, capped at the max seen."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(pct / 100 * self.count))
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return min(self.upper_bound(index), self.max)
+            return self.max
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            count, total, maximum = self.count, self.total, self.max
+            buckets = {str(index): n for index, n in enumerate(self._counts) if n}
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 4) if count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 4),
+            "p95_ms": round(self.percentile(95) * 1000, 4),
+            "p99_ms": round(self.percentile(99) * 1000, 4),
+            "max_ms": round(maximum * 1000, 4),
+            # Sparse, so snapshots from several processes can be combined later
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, max_series: int = MAX_SERIES):
+        self.enabled = os.environ.get("BILLING_METRICS", "1") != "0"
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        # kind ("method" or "query") -> name -> histogram
+        self._series: Dict[str, Dict[str, LatencyHistogram]] = {"method": {}, "query": {}}
+
+    def histogram(self, kind: str, name: str) -> LatencyHistogram:
+        series = self._series[kind]
+        histogram = series.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = series.get(name)
+                if histogram is None:
+                    if len(series) >= self.max_series:
+                        name = OVERFLOW_SERIES
+                    histogram = series.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def record(self, kind: str, name: str, seconds: float):
+        self.histogram(kind, name).record(seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            series = {kind: dict(entries) for kind, entries in self._series.items()}
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "pid": os.getpid(),
+            "bucket_scheme": {"min_seconds": MIN_SECONDS, "buckets_per_octave": BUCKETS_PER_OCTAVE},
+            "methods": {name: h.to_dict() for name, h in sorted(series["method"].items())},
+            "queries": {name: h.to_dict() for name, h in sorted(series["query"].items())},
+        }
+
+    def dump(self, path: str = RUNTIME_METRICS_FILE) -> str:
+        """Write a snapshot atomically, so readers never see a partial file."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._series = {"method": {}, "query": {}}
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+if os.environ.get("BILLING_METRICS_FILE"):
+    atexit.register(_registry.dump, os.environ["BILLING_METRICS_FILE"])
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Record the wall time of every call, including ones that raise."""
+    def decorate(fn: Callable) -> Callable:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _registry.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _registry.record("method", label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+# The trace callback receives SQL with the bound values expanded. Replacing
+# literals with ? gives back the parameterized statement, which keeps the
+# number of series bounded and card numbers or emails out of the metrics.
+# The lookahead lets the regex skip most characters without trying each branch.
+_LITERALS = re.compile(
+    r"(?=['\dxXN-])(?:"
+    r"'[^']*(?:''[^']*)*'"                      # strings
+    r"|[xX]'[0-9a-fA-F]*'"                      # blobs
+    r"|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?"  # numbers
+    r"|\bNULL\b)")
+_PLACEHOLDER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+# Statements without literals (BEGIN, COMMIT, fixed queries) are cached by
+# their text. Others are not: the key would hold the bound values.
+_STATIC_LABELS: Dict[str, str] = {}
+
+
+def normalize_sql(sql: str) -> str:
+    label = _STATIC_LABELS.get(sql)
+    if label is not None:
+        return label
+    text, literals = _LITERALS.subn("?", sql)
+    label = " ".join(_PLACEHOLDER_LISTS.sub("?, ...", text).split())[:MAX_LABEL_LENGTH]
+    if not literals and len(_STATIC_LABELS) < MAX_SERIES:
+        _STATIC_LABELS[sql] = label
+    return label
+
+
+# FTS5 reads its config and data_version with schema-qualified statements
+# while a statement on its table is being prepared, before that statement's
+# own trace event; application SQL never quotes the schema name
+_INTERNAL_STATEMENT = re.compile(r"(?:FROM|INTO|PRAGMA)\s+'\w+'\.")
+
+
+class QueryTimer:
+    """Per-connection sqlite3 trace callback that times each statement.
+
+    The callback fires when a statement starts, so a statement is timed
+    from its start to the start of the next one on the same connection, or
+    to finish(), which the pool calls when the connection is returned. That
+    includes fetching the rows. Implicit BEGIN/COMMIT appear as statements
+    of their own. Statements run inside another one (trigger programs and
+    FTS5's internal queries, reported with a leading "--", or the parent's
+    text repeated) are folded into the statement that ran them, and the
+    queries FTS5 runs while preparing a statement are counted toward it.
+    Bulk writes should go through executemany() (or the pool's), which
+    records the whole batch once instead of once per row.
+    """
+
+    def __init__(self, registry: MetricsRegistry, clock: Callable[[], float] = time.perf_counter):
+        self.registry = registry
+        self._clock = clock
+        self._sql = None
+        self._start = 0.0
+        # Start of FTS5's prepare-time queries for the statement to come
+        self._preparing: Optional[float] = None
+
+    def __call__(self, sql: str):
+        if sql == self._sql or sql.startswith("--"):
+            return
+        now = self._clock()
+        if _INTERNAL_STATEMENT.search(sql):
+            if self._preparing is None:
+                self._close(now)
+                self._preparing = now
+            return
+        self._close(now)
+        self._sql = sql
+        self._start = now if self._preparing is None else self._preparing
+        self._preparing = None
+
+    def executemany(self, conn, sql: str, rows):
+        """conn.executemany timed as one statement.
+
+        sqlite reports every row to the trace callback with its values
+        expanded, so left attached the timer would normalize and record each
+        row separately; the callback is detached for the duration instead.
+        """
+        now = self._clock()
+        self._close(now)
+        self._preparing = None
+        conn.set_trace_callback(None)
+        try:
+            return conn.executemany(sql, rows)
+        finally:
+            conn.set_trace_callback(self)
+            # Closed by the next statement or finish(), like any other
+            self._sql = sql
+            self._start = now
+
+    def _close(self, now: float):
+        if self._sql is not None:
+            self.registry.record("query", normalize_sql(self._sql), now - self._start)
+            self._sql = None
+
+    def finish(self):
+        self._close(self._clock())
+        self._preparing = None
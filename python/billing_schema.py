@@ -0,0 +1,188 @@
+"""
+Schema and migrations for the billing database.
+
+Migrations are applied in order and tracked with sqlite's user_version
+pragma, so running them again is a no-op. get_pool() applies them the first
+time a process opens a database; they can also be run by hand:
+
+    python python/billing_schema.py billing.db
+"""
+
+import sqlite3
+import sys
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Union
+
+CUSTOMER_NAME_INDEX = "customers_fts"
+CUSTOMER_NAME_INSERT_TRIGGER = f"""CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN
+                        INSERT INTO {CUSTOMER_NAME_INDEX} (rowid, name) VALUES (new.rowid, new.name);
+                    END"""
+
+
+def _add_customer_name_index(conn: sqlite3.Connection):
+    """Trigram full-text index over customers.name for substring search.
+
+    Needs FTS5 with the trigram tokenizer (SQLite 3.34+). Builds without it
+    skip the index and InvoiceDAO keeps using a LIKE scan.
+    """
+    try:
+        conn.execute(f"""CREATE VIRTUAL TABLE {CUSTOMER_NAME_INDEX} USING fts5(
+                            name, content='customers', content_rowid='rowid',
+                            tokenize='trigram')""")
+    except sqlite3.OperationalError:
+        return
+    # External content table: the triggers keep it in step with customers
+    conn.execute(CUSTOMER_NAME_INSERT_TRIGGER)
+    conn.execute(f"""CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN
+                        INSERT INTO {CUSTOMER_NAME_INDEX} ({CUSTOMER_NAME_INDEX}, rowid, name)
+                        VALUES ('delete', old.rowid, old.name);
+                    END""")
+    conn.execute(f"""CREATE TRIGGER customers_fts_update AFTER UPDATE OF name ON customers BEGIN
+                        INSERT INTO {CUSTOMER_NAME_INDEX} ({CUSTOMER_NAME_INDEX}, rowid, name)
+                        VALUES ('delete', old.rowid, old.name);
+                        INSERT INTO {CUSTOMER_NAME_INDEX} (rowid, name) VALUES (new.rowid, new.name);
+                    END""")
+    conn.execute(f"INSERT INTO {CUSTOMER_NAME_INDEX} ({CUSTOMER_NAME_INDEX}) VALUES ('rebuild')")
+
+
+def has_customer_name_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (CUSTOMER_NAME_INDEX,)).fetchone() is not None
+
+
+@contextmanager
+def bulk_customer_inserts(conn: sqlite3.Connection) -> Iterator[None]:
+    """Index customers inserted inside the block in one pass when it exits.
+
+    The per-row insert trigger costs several times the insert itself, so for
+    the duration of the caller's transaction (which must already be open)
+    it is dropped, the new rows are added to the name index with a single
+    INSERT ... SELECT, and the trigger is recreated. Other connections never
+    see the trigger missing. New rows are found by rowid: customers has no
+    AUTOINCREMENT, so they are numbered above the previous maximum.
+    """
+    if not conn.in_transaction or not has_customer_name_index(conn):
+        yield
+        return
+    last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM customers").fetchone()[0]
+    conn.execute("DROP TRIGGER customers_fts_insert")
+    yield
+    conn.execute(
+        f"INSERT INTO {CUSTOMER_NAME_INDEX} (rowid, name) "
+        f"SELECT rowid, name FROM customers WHERE rowid > ?", (last_rowid,))
+    conn.execute(CUSTOMER_NAME_INSERT_TRIGGER)
+
+
+_CUSTOMER_PROFILE_COLUMNS = {
+    "email": "TEXT",
+    "phone": "TEXT",
+    "age": "INTEGER",
+    "credit_limit": "REAL NOT NULL DEFAULT 0",
+    "status": "TEXT NOT NULL DEFAULT 'active'",
+    "created_date": "TEXT",
+    "closed_date": "TEXT",
+    "close_reason": "TEXT",
+}
+
+
+def _add_customer_profile_columns(conn: sqlite3.Connection):
+    """Profile columns and the email, status and active-over-credit indexes.
+
+    Databases created before the schema was tracked may already have some of
+    these columns (typically email), and ADD COLUMN fails on a duplicate, so
+    only the missing ones are added.
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(customers)")}
+    for column, definition in _CUSTOMER_PROFILE_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE customers ADD COLUMN {column} {definition}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_email ON customers (email)")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_customers_status_credit
+                        ON customers (status, credit_limit)""")
+
+
+# Each entry is one schema version, either a list of statements or a function
+# of the connection; never edit a shipped entry, append a new one
+MIGRATIONS: List[Union[List[str], Callable[[sqlite3.Connection], None]]] = [
+    # 1: base tables
+    [
+        """CREATE TABLE IF NOT EXISTS customers (
+               customer_id TEXT PRIMARY KEY,
+               name TEXT NOT NULL DEFAULT ''
+           )""",
+        """CREATE TABLE IF NOT EXISTS invoices (
+               invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
+               customer_id TEXT NOT NULL,
+               amount REAL NOT NULL,
+               status TEXT NOT NULL,
+               created_date TEXT NOT NULL DEFAULT (datetime('now'))
+           )""",
+        """CREATE TABLE IF NOT EXISTS payments (
+               payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+               customer_id TEXT NOT NULL,
+               amount REAL NOT NULL,
+               card_last4 TEXT,
+               auth_code TEXT,
+               account_last4 TEXT,
+               routing TEXT,
+               paypal_email TEXT,
+               status TEXT NOT NULL,
+               created_date TEXT NOT NULL DEFAULT (datetime('now'))
+           )""",
+    ],
+    # 2: indexes for per-customer invoice lookups. amount is included so the
+    # balance and credit aggregates are answered from the index alone.
+    [
+        """CREATE INDEX IF NOT EXISTS idx_invoices_customer_status
+               ON invoices (customer_id, status, amount)""",
+        """CREATE INDEX IF NOT EXISTS idx_invoices_customer_created
+               ON invoices (customer_id, created_date)""",
+    ],
+    # 3: full-text index on customer names for search_invoices
+    _add_customer_name_index,
+    # 4: customer profile columns for SqliteCustomerStore
+    _add_customer_profile_columns,
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations and return the resulting schema version."""
+    if schema_version(conn) >= len(MIGRATIONS):
+        return schema_version(conn)
+
+    if conn.in_transaction:
+        conn.commit()
+
+    # IMMEDIATE takes the write lock before re-reading the version, so two
+    # processes starting together don't both apply the same migration
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(conn)
+        for version in range(current + 1, len(MIGRATIONS) + 1):
+            migration = MIGRATIONS[version - 1]
+            if callable(migration):
+                migration(conn)
+            else:
+                for statement in migration:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return schema_version(conn)
+
+
+if __name__ == '__main__':
+    database = sys.argv[1] if len(sys.argv) > 1 else "billing.db"
+    conn = sqlite3.connect(database)
+    try:
+        print(f"{database}: schema version {migrate(conn)}")
+    finally:
+        conn.close()
@@ -26,14 +26,19 @@ Code Health Issues in This File:
 """
 
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional
+from customer_store import CustomerStore, InMemoryCustomerStore
 from invoice_dao import InvoiceDAO
 import re
 
+
 class CustomerServlet:
-    def __init__(self):
-        self.invoice_dao = InvoiceDAO()
-        self.customers = {}
+    def __init__(self, store: Optional[CustomerStore] = None,
+                 invoice_dao: Optional[InvoiceDAO] = None):
+        self.invoice_dao = invoice_dao or InvoiceDAO()
+        # Pass SqliteCustomerStore() to keep customers across restarts; compared
+        # with None because an empty store is falsy
+        self.store = store if store is not None else InMemoryCustomerStore()
     
     # CRITICAL: Zero tests on this validation logic
     def create_customer(self, customer_id: str, name: str, email: str, 
@@ -50,31 +55,25 @@ class CustomerServlet:
             "created_date": datetime.now()
         }
         
-        self.customers[customer_id] = customer
+        self.store.put(customer)
         return True
     
     # No validation of email format
     def update_email(self, customer_id: str, new_email: str) -> bool:
-        if customer_id in self.customers:
-            self.customers[customer_id]["email"] = new_email
-            return True
-        return False
+        return self.store.update(customer_id, email=new_email)
     
     # No boundary checks on credit limit
     def update_credit_limit(self, customer_id: str, new_limit: float) -> bool:
-        if customer_id in self.customers:
-            # Magic numbers - what's the business rule?
-            if new_limit > 0:
-                self.customers[customer_id]["credit_limit"] = new_limit
-                return True
+        # Magic numbers - what's the business rule?
+        if new_limit > 0:
+            return self.store.update(customer_id, credit_limit=new_limit)
         return False
     
-    # CRITICAL: Complex business logic with zero tests
-    def approve_credit_increase(self, customer_id: str, requested_increase: float) -> bool:
-        if customer_id not in self.customers:
+    # Rules that don't need payment history
+    def _credit_increase_eligible(self, customer: Optional[Dict], requested_increase: float) -> bool:
+        if customer is None:
             return False
         
-        customer = self.customers[customer_id]
         current_limit = customer["credit_limit"]
         age = customer["age"]
         
@@ -90,58 +89,64 @@ class CustomerServlet:
             # Total limit cannot exceed $10,000
             return False
         
-        # Check payment history
-        invoices = self.invoice_dao.get_invoices_by_customer(customer_id)
-        late_payments = 0
-        for invoice in invoices:
-            if invoice["status"] == "late":
-                late_payments += 1
+        return True
+    
+    # CRITICAL: Complex business logic with zero tests
+    def approve_credit_increase(self, customer_id: str, requested_increase: float) -> bool:
+        customer = self.store.get(customer_id)
+        if not self._credit_increase_eligible(customer, requested_increase):
+            return False
         
-        if late_payments > 2:
+        # Check payment history
+        if self.invoice_dao.get_late_invoice_count(customer_id) > 2:
             # Too many late payments
             return False
         
         # Approve the increase
-        customer["credit_limit"] = current_limit + requested_increase
-        return True
+        return self.store.update(
+            customer_id, credit_limit=customer["credit_limit"] + requested_increase)
+    
+    # Batch form of approve_credit_increase: one bulk summary query for all
+    # customers that pass the history-independent rules
+    def approve_credit_increases(self, requests: Dict[str, float]) -> Dict[str, bool]:
+        results = {customer_id: False for customer_id in requests}
+        customers = self.store.get_many(requests)
+        eligible = [customer_id for customer_id, increase in requests.items()
+                    if self._credit_increase_eligible(customers.get(customer_id), increase)]
+        
+        summaries = self.invoice_dao.get_invoice_summaries(eligible)
+        for customer_id in eligible:
+            if summaries[customer_id]["late_count"] > 2:
+                continue
+            results[customer_id] = self.store.update(
+                customer_id,
+                credit_limit=customers[customer_id]["credit_limit"] + requests[customer_id])
+        
+        return results
     
     # Missing validation on phone format
     def update_phone(self, customer_id: str, new_phone: str) -> bool:
-        if customer_id in self.customers:
-            self.customers[customer_id]["phone"] = new_phone
-            return True
-        return False
+        return self.store.update(customer_id, phone=new_phone)
     
     # No error handling for missing customer
     def get_customer(self, customer_id: str) -> Optional[Dict]:
-        return self.customers.get(customer_id)  # Will return None if customer doesn't exist
+        return self.store.get(customer_id)  # Will return None if customer doesn't exist
     
     # CRITICAL: Account closure logic with zero tests
     def close_account(self, customer_id: str, reason: str) -> bool:
-        if customer_id not in self.customers:
+        if customer_id not in self.store:
             return False
         
-        customer = self.customers[customer_id]
-        
         # Check for outstanding invoices
-        invoices = self.invoice_dao.get_invoices_by_customer(customer_id)
-        total_outstanding = 0
-        
-        for invoice in invoices:
-            status = invoice["status"]
-            if status == "pending" or status == "late":
-                total_outstanding += invoice["amount"]
+        total_outstanding = self.invoice_dao.get_outstanding_balance(customer_id)
         
         if total_outstanding > 0:
             # Cannot close account with outstanding balance
             return False
         
         # Close the account
-        customer["status"] = "closed"
-        customer["closed_date"] = datetime.now()
-        customer["close_reason"] = reason
-        
-        return True
+        return self.store.update(
+            customer_id, status="closed", closed_date=datetime.now(), close_reason=reason)
     
     # Duplicate validation logic - should be extracted
     def validate_customer_data(self, name: str, email: str, phone: str, age: int) -> bool:
@@ -161,18 +166,30 @@ class CustomerServlet:
     
     # No tests for this calculation logic
     def calculate_available_credit(self, customer_id: str) -> float:
-        if customer_id not in self.customers:
+        customer = self.store.get(customer_id)
+        if customer is None:
             return 0
         
-        customer = self.customers[customer_id]
         credit_limit = customer["credit_limit"]
         
-        invoices = self.invoice_dao.get_invoices_by_customer(customer_id)
-        total_used = 0
-        
-        for invoice in invoices:
-            status = invoice["status"]
-            if status != "paid" and status != "cancelled":
-                total_used += invoice["amount"]
+        total_used = self.invoice_dao.get_used_credit(customer_id)
         
         return credit_limit - total_used
+    
+    # Batch form of calculate_available_credit for scoring many customers
+    def calculate_available_credit_many(self, customer_ids: Iterable[str]) -> Dict[str, float]:
+        ids = list(customer_ids)
+        customers = self.store.get_many(ids)
+        summaries = self.invoice_dao.get_invoice_summaries(customers)
+        
+        available = {customer_id: 0 for customer_id in ids}
+        for customer_id, customer in customers.items():
+            credit_limit = customer["credit_limit"]
+            available[customer_id] = credit_limit - summaries[customer_id]["used_credit"]
+        return available
+    
+    # Outstanding (pending + late) balance per customer, as checked by close_account
+    def get_outstanding_balances(self, customer_ids: Iterable[str]) -> Dict[str, float]:
+        summaries = self.invoice_dao.get_invoice_summaries(customer_ids)
+        return {customer_id: summary["outstanding"]
+                for customer_id, summary in summaries.items()}
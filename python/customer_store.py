@@ -0,0 +1,319 @@
+"""
+Storage backends for CustomerServlet.
+
+- InMemoryCustomerStore keeps hash indexes on email and status and a sorted
+  (credit_limit, customer_id) list of active customers.
+- SqliteCustomerStore persists to the customers table of the billing
+  database; its columns and indexes come from billing_schema migration 4.
+
+Records are dicts keyed by the CUSTOMER_FIELDS names. Stores hand out
+copies, so changes must go through update() to keep the indexes right.
+"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from billing_schema import bulk_customer_inserts
+from db_pool import IN_PLACEHOLDERS, ConnectionPool, get_pool, in_chunks
+
+CUSTOMER_FIELDS = (
+    "customer_id", "name", "email", "phone", "age", "credit_limit",
+    "status", "created_date", "closed_date", "close_reason",
+)
+_FIELD_SET = frozenset(CUSTOMER_FIELDS)
+DATE_FIELDS = ("created_date", "closed_date")
+# Fill-ins for the NOT NULL columns when a record leaves them out
+COLUMN_DEFAULTS = {"name": "", "credit_limit": 0, "status": "active"}
+BULK_LOAD_BATCH = 10000
+
+
+class CustomerStore(ABC):
+    """Interface shared by the customer storage backends."""
+
+    @abstractmethod
+    def get(self, customer_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def get_many(self, customer_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Records for the IDs that exist; missing IDs are left out."""
+        ...
+
+    @abstractmethod
+    def put(self, customer: Dict):
+        """Insert the record, replacing any existing one with the same ID."""
+        ...
+
+    @abstractmethod
+    def update(self, customer_id: str, **fields) -> bool:
+        """Change some fields of an existing record; False if it doesn't exist."""
+        ...
+
+    @abstractmethod
+    def bulk_load(self, customers: Iterable[Dict]) -> int:
+        """put() for many records at once; returns how many were loaded."""
+        ...
+
+    @abstractmethod
+    def find_by_email(self, email: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def find_by_status(self, status: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def find_active_over_credit(self, min_credit_limit: float) -> List[Dict]:
+        """Active customers with credit_limit above the threshold, lowest limit first."""
+        ...
+
+    def __contains__(self, customer_id: str) -> bool:
+        return self.get(customer_id) is not None
+
+
+def _check_fields(fields: Iterable[str]):
+    if _FIELD_SET.issuperset(fields):
+        return
+    unknown = set(fields) - _FIELD_SET
+    if unknown:
+        raise ValueError(f"Unknown customer fields: {', '.join(sorted(unknown))}")
+
+
+def _record(customer: Dict) -> Dict:
+    """Copy with every CUSTOMER_FIELDS key present, as SqliteCustomerStore returns."""
+    _check_fields(customer)
+    return {field: customer.get(field) for field in CUSTOMER_FIELDS}
+
+
+class InMemoryCustomerStore(CustomerStore):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._customers: Dict[str, Dict] = {}
+        # Secondary indexes: field value -> set of customer IDs
+        self._by_email: Dict[str, set] = {}
+        self._by_status: Dict[str, set] = {}
+        # (credit_limit, customer_id) for active customers, kept sorted
+        self._active_credit: List[tuple] = []
+
+    def _index(self, customer: Dict, keep_sorted: bool = True):
+        customer_id = customer["customer_id"]
+        self._by_email.setdefault(customer.get("email"), set()).add(customer_id)
+        self._by_status.setdefault(customer.get("status"), set()).add(customer_id)
+        if customer.get("status") == "active":
+            entry = (customer.get("credit_limit") or 0, customer_id)
+            if keep_sorted:
+                bisect.insort(self._active_credit, entry)
+            else:
+                self._active_credit.append(entry)
+
+    def _unindex(self, customer: Dict):
+        customer_id = customer["customer_id"]
+        for index, key in ((self._by_email, customer.get("email")),
+                           (self._by_status, customer.get("status"))):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(customer_id)
+                if not ids:
+                    del index[key]
+        if customer.get("status") == "active":
+            entry = (customer.get("credit_limit") or 0, customer_id)
+            position = bisect.bisect_left(self._active_credit, entry)
+            if position < len(self._active_credit) and self._active_credit[position] == entry:
+                del self._active_credit[position]
+
+    def get(self, customer_id: str) -> Optional[Dict]:
+        with self._lock:
+            customer = self._customers.get(customer_id)
+            return dict(customer) if customer is not None else None
+
+    def get_many(self, customer_ids: Iterable[str]) -> Dict[str, Dict]:
+        with self._lock:
+            return {customer_id: dict(self._customers[customer_id])
+                    for customer_id in customer_ids if customer_id in self._customers}
+
+    def put(self, customer: Dict):
+        customer = _record(customer)
+        with self._lock:
+            previous = self._customers.get(customer["customer_id"])
+            if previous is not None:
+                self._unindex(previous)
+            self._customers[customer["customer_id"]] = customer
+            self._index(customer)
+
+    def update(self, customer_id: str, **fields) -> bool:
+        _check_fields(fields)
+        with self._lock:
+            customer = self._customers.get(customer_id)
+            if customer is None:
+                return False
+            self._unindex(customer)
+            customer.update(fields)
+            self._index(customer)
+            return True
+
+    def bulk_load(self, customers: Iterable[Dict]) -> int:
+        loaded = {}
+        for customer in customers:
+            customer = _record(customer)
+            loaded[customer["customer_id"]] = customer
+        with self._lock:
+            # Unindex replaced records first, while the credit list is still sorted
+            for customer_id in loaded:
+                previous = self._customers.get(customer_id)
+                if previous is not None:
+                    self._unindex(previous)
+            for customer_id, customer in loaded.items():
+                self._customers[customer_id] = customer
+                self._index(customer, keep_sorted=False)
+            # One sort for the whole load instead of an insort per record
+            self._active_credit.sort()
+        return len(loaded)
+
+    def _records(self, customer_ids: Iterable[str]) -> List[Dict]:
+        return [dict(self._customers[customer_id]) for customer_id in customer_ids]
+
+    def find_by_email(self, email: str) -> List[Dict]:
+        with self._lock:
+            return self._records(self._by_email.get(email, ()))
+
+    def find_by_status(self, status: str) -> List[Dict]:
+        with self._lock:
+            return self._records(self._by_status.get(status, ()))
+
+    def find_active_over_credit(self, min_credit_limit: float) -> List[Dict]:
+        with self._lock:
+            start = bisect.bisect_right(self._active_credit, min_credit_limit,
+                                        key=lambda entry: entry[0])
+            return self._records(customer_id for _, customer_id in self._active_credit[start:])
+
+    def __contains__(self, customer_id: str) -> bool:
+        with self._lock:
+            return customer_id in self._customers
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._customers)
+
+
+CUSTOMER_COLUMNS = ", ".join(CUSTOMER_FIELDS)
+SELECT_CUSTOMER_SQL = f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE customer_id = ?"
+SELECT_CUSTOMERS_SQL = f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE customer_id IN {IN_PLACEHOLDERS}"
+# An upsert rather than INSERT OR REPLACE: REPLACE deletes the old row without
+# firing delete triggers, which would leave the customer name index stale
+UPSERT_CUSTOMER_SQL = (
+    f"INSERT INTO customers ({CUSTOMER_COLUMNS}) "
+    f"VALUES ({', '.join('?' * len(CUSTOMER_FIELDS))}) "
+    f"ON CONFLICT (customer_id) DO UPDATE SET "
+    + ", ".join(f"{field} = excluded.{field}" for field in CUSTOMER_FIELDS[1:]))
+FIND_BY_EMAIL_SQL = f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE email = ?"
+FIND_BY_STATUS_SQL = f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE status = ?"
+FIND_ACTIVE_OVER_CREDIT_SQL = (
+    f"SELECT {CUSTOMER_COLUMNS} FROM customers "
+    f"WHERE status = 'active' AND credit_limit > ? ORDER BY credit_limit, customer_id")
+
+
+_DATE_POSITIONS = [CUSTOMER_FIELDS.index(field) for field in DATE_FIELDS]
+
+
+def _to_db(field: str, value):
+    # datetimes are stored as ISO-8601 text, like sqlite's own datetime()
+    if field in DATE_FIELDS and isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def _customer_row(cursor, row: tuple) -> Dict:
+    customer = dict(zip(CUSTOMER_FIELDS, row))
+    for field in DATE_FIELDS:
+        if customer[field] is not None:
+            customer[field] = datetime.fromisoformat(customer[field])
+    return customer
+
+
+class SqliteCustomerStore(CustomerStore):
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        # Same billing database (and pool) as InvoiceDAO unless told otherwise
+        self.pool = pool or get_pool("billing.db")
+
+    def _query(self, conn, sql: str, params=()):
+        cursor = conn.cursor()
+        cursor.row_factory = _customer_row
+        return cursor.execute(sql, params)
+
+    @staticmethod
+    def _params(customer: Dict) -> list:
+        _check_fields(customer)
+        params = [customer.get(field, COLUMN_DEFAULTS.get(field)) for field in CUSTOMER_FIELDS]
+        for position in _DATE_POSITIONS:
+            params[position] = _to_db(CUSTOMER_FIELDS[position], params[position])
+        return params
+
+    def get(self, customer_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            return self._query(conn, SELECT_CUSTOMER_SQL, (customer_id,)).fetchone()
+
+    def get_many(self, customer_ids: Iterable[str]) -> Dict[str, Dict]:
+        ids = list(dict.fromkeys(customer_ids))
+        customers = {}
+        with self.pool.connection() as conn:
+            for params in in_chunks(ids):
+                for customer in self._query(conn, SELECT_CUSTOMERS_SQL, params):
+                    customers[customer["customer_id"]] = customer
+        return customers
+
+    def put(self, customer: Dict):
+        with self.pool.connection() as conn:
+            conn.execute(UPSERT_CUSTOMER_SQL, self._params(customer))
+
+    def update(self, customer_id: str, **fields) -> bool:
+        if not fields:
+            return customer_id in self
+        _check_fields(fields)
+        # Field names are checked against CUSTOMER_FIELDS above; values are bound
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        params = [_to_db(field, value) for field, value in fields.items()]
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                f"UPDATE customers SET {assignments} WHERE customer_id = ?",
+                params + [customer_id])
+            return cursor.rowcount > 0
+
+    def bulk_load(self, customers: Iterable[Dict]) -> int:
+        """Load in batches of BULK_LOAD_BATCH, one transaction per batch."""
+        count = 0
+        # Keyed by customer_id: the last record for an ID wins, as in memory.
+        # A repeat within one batch would otherwise upsert a row whose insert
+        # bulk_customer_inserts hasn't indexed yet, corrupting the name index.
+        batch: Dict[str, list] = {}
+        for customer in customers:
+            params = self._params(customer)
+            batch[params[0]] = params
+            if len(batch) >= BULK_LOAD_BATCH:
+                count += self._load_batch(list(batch.values()))
+                batch = {}
+        if batch:
+            count += self._load_batch(list(batch.values()))
+        return count
+
+    def _load_batch(self, batch: List[list]) -> int:
+        with self.pool.connection() as conn:
+            # Explicit BEGIN: the trigger DDL in bulk_customer_inserts must be
+            # part of the same transaction as the rows
+            conn.execute("BEGIN IMMEDIATE")
+            with bulk_customer_inserts(conn):
+                self.pool.executemany(conn, UPSERT_CUSTOMER_SQL, batch)
+        return len(batch)
+
+    def find_by_email(self, email: str) -> List[Dict]:
+        with self.pool.connection() as conn:
+            return self._query(conn, FIND_BY_EMAIL_SQL, (email,)).fetchall()
+
+    def find_by_status(self, status: str) -> List[Dict]:
+        with self.pool.connection() as conn:
+            return self._query(conn, FIND_BY_STATUS_SQL, (status,)).fetchall()
+
+    def find_active_over_credit(self, min_credit_limit: float) -> List[Dict]:
+        with self.pool.connection() as conn:
+            return self._query(conn, FIND_ACTIVE_OVER_CREDIT_SQL, (min_credit_limit,)).fetchall()
@@ -0,0 +1,203 @@
+"""
+Connection pool shared by the billing data access classes.
+
+connection() checks out a pooled sqlite3 connection for one unit of work,
+commits on success, rolls back on error and always returns it. New
+connections are configured by a DatabaseConfig: WAL mode with
+synchronous=FULL by default. synchronous="NORMAL" is faster but can lose the
+last commits on power failure; GroupCommitWriter recovers the throughput
+without that risk. While runtime metrics are enabled, each connection also
+gets a billing_metrics.QueryTimer trace callback.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+from billing_metrics import QueryTimer, get_registry
+from billing_schema import migrate
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CHECKOUT_TIMEOUT = 5.0
+DEFAULT_CACHED_STATEMENTS = 256
+# Stays under SQLITE_MAX_VARIABLE_NUMBER (999 on older builds)
+IN_CHUNK_SIZE = 500
+# "(?, ?, ...)" for a "WHERE column IN" clause fed by in_chunks()
+IN_PLACEHOLDERS = f"({', '.join('?' * IN_CHUNK_SIZE)})"
+
+
+class DatabaseConfig:
+    def __init__(self, journal_mode: str = "WAL", synchronous: str = "FULL",
+                 cache_size_kib: int = 16384, busy_timeout_ms: int = 5000,
+                 mmap_size: int = 64 * 1024 * 1024, temp_store: str = "MEMORY"):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.temp_store = temp_store
+
+    def apply(self, conn: sqlite3.Connection):
+        # journal_mode is stored in the database file; the rest are per connection
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+
+class ConnectionPool:
+    def __init__(self, database: str, max_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_CHECKOUT_TIMEOUT,
+                 cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+                 config: Optional[DatabaseConfig] = None):
+        self.database = database
+        self.config = config or DatabaseConfig()
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        # LIFO keeps recently used connections (and their statement caches) warm
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        # id(conn) -> QueryTimer; sqlite3 connections don't take attributes
+        self._timers: Dict[int, QueryTimer] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        try:
+            self.config.apply(conn)
+        except Exception:
+            conn.close()
+            raise
+        registry = get_registry()
+        if registry.enabled:
+            timer = QueryTimer(registry)
+            conn.set_trace_callback(timer)
+            self._timers[id(conn)] = timer
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        self._timers.pop(id(conn), None)
+        conn.close()
+        with self._lock:
+            self._created -= 1
+
+    def _checkout(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No connection to {self.database} available within {self.timeout}s")
+
+    def _release(self, conn: sqlite3.Connection, broken: bool = False):
+        timer = self._timers.get(id(conn))
+        if timer is not None:
+            timer.finish()
+        if broken or self._closed:
+            self._discard(conn)
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for one unit of work.
+
+        The transaction is committed when the block exits normally and rolled
+        back if it raises; the connection goes back to the pool either way.
+        """
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
+            raise
+        finally:
+            self._release(conn, broken)
+
+    def executemany(self, conn: sqlite3.Connection, sql: str, rows) -> sqlite3.Cursor:
+        """conn.executemany, timed as a single statement when metrics are on."""
+        timer = self._timers.get(id(conn))
+        if timer is None:
+            return conn.executemany(sql, rows)
+        return timer.executemany(conn, sql, rows)
+
+    def close(self):
+        """Close idle connections; checked-out ones close when released."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database: str, config: Optional[DatabaseConfig] = None) -> ConnectionPool:
+    """Return the process-wide pool for a database file, creating it once.
+
+    Pending schema migrations are applied when the pool is first created.
+    config only takes effect for the call that creates the pool.
+    """
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(database, config=config)
+            with pool.connection() as conn:
+                migrate(conn)
+            _pools[database] = pool
+        return pool
+
+
+def in_chunks(values: Sequence) -> Iterator[List]:
+    """Split values into IN_CHUNK_SIZE parameter lists for an IN_PLACEHOLDERS query.
+
+    Every chunk is padded with NULLs (which never match) so the statement
+    text is identical for every chunk and stays in the statement cache.
+    """
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        chunk = list(values[start:start + IN_CHUNK_SIZE])
+        yield chunk + [None] * (IN_CHUNK_SIZE - len(chunk))
@@ -0,0 +1,132 @@
+"""
+Group commit for concurrent billing writes.
+
+With one transaction per payment, every concurrent PaymentProcessor call
+pays for its own commit and they queue on SQLite's single write lock. The
+GroupCommitWriter funnels those writes to one thread that gathers whatever
+queued up while the previous group was committing (optionally waiting a
+short window for more), runs each write under its own savepoint and commits
+the lot once. A failing write is rolled back to its savepoint and
+reported to its caller alone; the others in the group still commit.
+Callers block until their write is durable, so semantics are unchanged.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Sequence
+from db_pool import ConnectionPool
+
+# Waiting adds latency without helping much: groups form naturally while the
+# previous commit runs. A small window pays off only with few writers.
+DEFAULT_WINDOW_SECONDS = 0.0
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_PENDING = 10000
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, pool: ConnectionPool, window: float = DEFAULT_WINDOW_SECONDS,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_pending: int = DEFAULT_MAX_PENDING):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Held across the closed check and the put, so nothing can be queued
+        # behind the stop marker
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stopping = False
+        self.commits = 0
+        self.writes = 0
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: Sequence = ()) -> Future:
+        """Queue one statement; the future resolves once its group has committed."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Group commit writer is closed")
+            self._queue.put((sql, params, future))
+        return future
+
+    def execute(self, sql: str, params: Sequence = (), timeout: Optional[float] = None):
+        """Run one statement and wait for it to be committed."""
+        return self.submit(sql, params).result(timeout)
+
+    def _collect(self, first) -> list:
+        jobs = [first]
+        deadline = time.monotonic() + self.window
+        while len(jobs) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                self._stopping = True
+                break
+            jobs.append(job)
+        return jobs
+
+    def _commit_group(self, jobs: list):
+        done = []
+        try:
+            with self.pool.connection() as conn:
+                # Explicit BEGIN so the savepoints nest inside one transaction
+                # instead of each RELEASE committing on its own
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params, future in jobs:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT group_write")
+                    try:
+                        cursor = conn.execute(sql, params)
+                        conn.execute("RELEASE group_write")
+                        done.append((future, cursor.lastrowid))
+                    except Exception as ex:
+                        conn.execute("ROLLBACK TO group_write")
+                        conn.execute("RELEASE group_write")
+                        future.set_exception(ex)
+        except Exception as ex:
+            # Commit (or BEGIN) failed: nothing in the group was written
+            for future, _ in done:
+                future.set_exception(ex)
+            for _, _, future in jobs:
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(ex)
+            return
+
+        self.commits += 1
+        self.writes += len(done)
+        for future, lastrowid in done:
+            future.set_result(lastrowid)
+
+    def _run(self):
+        while not self._stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            self._commit_group(self._collect(first))
+        # Anything queued behind the stop marker would otherwise wait forever
+        while True:
+            try:
+                _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Group commit writer is closed"))
+
+    def close(self, timeout: Optional[float] = None):
+        """Commit everything already submitted, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
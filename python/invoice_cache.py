@@ -0,0 +1,114 @@
+"""
+In-process cache of per-customer invoice summaries.
+
+CustomerServlet's credit checks ask for the same customer's outstanding
+balance, used credit and late count over and over. InvoiceDAO keeps those
+summaries here, bounded by an LRU size limit and a TTL, and invalidates a
+customer's entry whenever it writes one of their invoices.
+
+A read that races with a write could otherwise cache the pre-write summary
+after the writer has invalidated it. Readers therefore take a token before
+querying and put() refuses values whose token predates the customer's last
+invalidation.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_TTL_SECONDS = 30.0
+
+
+class InvoiceSummaryCache:
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # customer_id -> (expires_at, summary), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # customer_id -> tick of its last invalidation, bounded like _entries;
+        # _floor covers customers whose record was dropped
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, customer_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(customer_id)
+                    self.hits += 1
+                    return dict(entry[1])
+                del self._entries[customer_id]
+            self.misses += 1
+            return None
+
+    def token(self) -> int:
+        """Take before reading the database; pass to put() afterwards."""
+        with self._lock:
+            return self._tick
+
+    def put(self, customer_id: str, summary: Dict, token: int) -> bool:
+        with self._lock:
+            if self._invalidated.get(customer_id, self._floor) > token:
+                # A write landed while this summary was being computed
+                return False
+            self._entries[customer_id] = (self._clock() + self.ttl, dict(summary))
+            self._entries.move_to_end(customer_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, customer_id: str):
+        with self._lock:
+            self._tick += 1
+            self._entries.pop(customer_id, None)
+            self._invalidated[customer_id] = self._tick
+            self._invalidated.move_to_end(customer_id)
+            while len(self._invalidated) > self.max_size:
+                _, tick = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, tick)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._tick += 1
+            self._entries.clear()
+            self._invalidated.clear()
+            self._floor = self._tick
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_caches: Dict[str, InvoiceSummaryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_summary_cache(database: str) -> InvoiceSummaryCache:
+    """Process-wide cache per database, so every InvoiceDAO sees the same invalidations."""
+    with _caches_lock:
+        cache = _caches.get(database)
+        if cache is None:
+            cache = InvoiceSummaryCache()
+            _caches[database] = cache
+        return cache
@@ -7,100 +7,209 @@ poor error handling, etc.) designed to help learners practice establishing code
 baselines and identifying critical issues with AI assistance.
 
 Activity: Code Health Observatory - Metrics, Dashboards, and What Actually Matters
-Purpose: Data access layer with critical security vulnerabilities
-Focus Area: Security vulnerabilities, SQL injection risks, missing tests
+Purpose: Data access layer with critical testing gaps
+Focus Area: Missing tests, error handling, input validation
 
 Code Health Issues in This File:
-- Multiple SQL injection vulnerabilities (raw SQL with string concatenation)
-- No parameterized queries
 - Hard-coded database credentials
 - Zero unit tests for data access logic
-- No connection pooling or resource management
 - Missing error handling for database failures
 - No logging of database operations
 - Direct exposure of database exceptions
-- No transaction management
 - Missing validation on all inputs
 - Code duplication across CRUD operations
 """
 
-import sqlite3
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from billing_metrics import timed
+from billing_schema import CUSTOMER_NAME_INDEX, has_customer_name_index
+from db_pool import IN_PLACEHOLDERS, ConnectionPool, get_pool, in_chunks
+from invoice_cache import InvoiceSummaryCache, get_summary_cache
+from invoice_rows import InvoiceRow, InvoiceSearchRow, invoice_row, invoice_search_row, query
+
+SEARCH_PAGE_SIZE = 500
+# The trigram index can only narrow a search term of at least three characters
+MIN_INDEXED_SEARCH = 3
+# The indexed search sorts every matching invoice on each page, while the LIKE
+# search walks invoices in order and stops once a page is full; past a few
+# thousand matching customers the walk is faster
+MAX_INDEXED_SEARCH_CUSTOMERS = 2000
+
+# Column order matches the InvoiceRow / InvoiceSearchRow fields
+INVOICE_COLUMNS = "invoice_id, customer_id, amount, status, created_date"
+
+# Parameterized statements: the SQL text is constant, so pooled connections
+# reuse the prepared statement from sqlite's statement cache
+SELECT_INVOICE_SQL = f"SELECT {INVOICE_COLUMNS} FROM invoices WHERE invoice_id = ?"
+SELECT_CUSTOMER_INVOICES_SQL = (
+    f"SELECT {INVOICE_COLUMNS} FROM invoices WHERE customer_id = ? ORDER BY created_date DESC")
+SELECT_INVOICES_FOR_CUSTOMERS_SQL = (
+    f"SELECT {INVOICE_COLUMNS} FROM invoices WHERE customer_id IN {IN_PLACEHOLDERS} "
+    f"ORDER BY customer_id, created_date DESC")
+# Aggregates over the (customer_id, status, amount) index; see billing_schema
+SUMMARY_COLUMNS = """customer_id,
+           COALESCE(SUM(CASE WHEN status IN ('pending', 'late') THEN amount END), 0),
+           COALESCE(SUM(CASE WHEN status NOT IN ('paid', 'cancelled') THEN amount END), 0),
+           COUNT(CASE WHEN status = 'late' THEN 1 END)"""
+SUMMARY_SQL = f"SELECT {SUMMARY_COLUMNS} FROM invoices WHERE customer_id = ?"
+SUMMARIES_FOR_CUSTOMERS_SQL = (
+    f"SELECT {SUMMARY_COLUMNS} FROM invoices WHERE customer_id IN {IN_PLACEHOLDERS} "
+    f"GROUP BY customer_id")
+INSERT_INVOICE_SQL = (
+    "INSERT INTO invoices (customer_id, amount, status, created_date) "
+    "VALUES (?, ?, ?, datetime('now'))")
+SELECT_INVOICE_CUSTOMER_SQL = "SELECT customer_id FROM invoices WHERE invoice_id = ?"
+UPDATE_STATUS_SQL = "UPDATE invoices SET status = ? WHERE invoice_id = ?"
+DELETE_INVOICE_SQL = "DELETE FROM invoices WHERE invoice_id = ?"
+# Keyset pagination: each page resumes after the last invoice_id returned
+SEARCH_FILTERS = """AND i.status = ?
+                     AND i.amount >= ?
+                     AND i.amount <= ?
+                     AND i.invoice_id > ?
+                     ORDER BY i.invoice_id
+                     LIMIT ?"""
+SEARCH_INVOICES_SQL = f"""SELECT i.invoice_id, i.customer_id, c.name, i.amount, i.status
+                     FROM invoices i
+                     JOIN customers c ON i.customer_id = c.customer_id
+                     WHERE c.name LIKE '%' || ? || '%'
+                     {SEARCH_FILTERS}"""
+# Same LIKE semantics, but answered from the trigram index instead of
+# scanning every customer name. The matching rowids are resolved once and
+# CROSS JOIN pins customers as the outer loop: with sqlite_stat1 present
+# (after ANALYZE) the planner otherwise walks invoices by invoice_id and
+# probes the FTS table once per invoice.
+SEARCH_INVOICES_INDEXED_SQL = f"""SELECT i.invoice_id, i.customer_id, c.name, i.amount, i.status
+                     FROM customers c
+                     CROSS JOIN invoices i ON i.customer_id = c.customer_id
+                     WHERE c.rowid IN (SELECT rowid FROM {CUSTOMER_NAME_INDEX}
+                                       WHERE name LIKE '%' || ? || '%')
+                     {SEARCH_FILTERS}"""
+COUNT_NAME_MATCHES_SQL = f"""SELECT COUNT(*) FROM
+                     (SELECT 1 FROM {CUSTOMER_NAME_INDEX} WHERE name LIKE '%' || ? || '%' LIMIT ?)"""
+
 
 class InvoiceDAO:
-    def __init__(self):
+    def __init__(self, pool: Optional[ConnectionPool] = None,
+                 summary_cache: Optional[InvoiceSummaryCache] = None):
         # Hard-coded credentials - security issue
         self.conn_str = "billing.db"
+        # Shared with PaymentProcessor unless a pool is passed in
+        self.pool = pool or get_pool(self.conn_str)
+        # Shared by every DAO on this database so invalidations reach all readers;
+        # keyed by the pool's file, which may not be conn_str
+        self.summary_cache = summary_cache or get_summary_cache(self.pool.database)
+        self._name_index = None
     
-    # SQL Injection vulnerability - no parameterized query
-    def get_invoice(self, invoice_id: str) -> Optional[Dict]:
+    @timed()
+    def get_invoice(self, invoice_id: str) -> Optional[InvoiceRow]:
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"SELECT * FROM invoices WHERE invoice_id = '{invoice_id}'"
-            cursor.execute(sql)
-            row = cursor.fetchone()
-            
-            if row:
-                invoice = {
-                    "invoice_id": row[0],
-                    "customer_id": row[1],
-                    "amount": row[2],
-                    "status": row[3],
-                    "created_date": row[4]
-                }
-                conn.close()
-                return invoice
-            
-            conn.close()
+            with self.pool.connection() as conn:
+                return query(conn, invoice_row, SELECT_INVOICE_SQL, (invoice_id,)).fetchone()
         except Exception as ex:
             # Poor error handling - exposing internal details
             raise Exception(f"Database error: {ex}")
-        
-        return None
     
-    # More SQL injection vulnerabilities
-    def get_invoices_by_customer(self, customer_id: str) -> List[Dict]:
-        invoices = []
+    @timed()
+    def get_invoices_by_customer(self, customer_id: str) -> List[InvoiceRow]:
+        try:
+            with self.pool.connection() as conn:
+                return query(conn, invoice_row, SELECT_CUSTOMER_INVOICES_SQL, (customer_id,)).fetchall()
+        except Exception as ex:
+            raise Exception(f"Database error: {ex}")
+    
+    @timed()
+    def get_invoices_by_customers(self, customer_ids: Iterable[str]) -> Dict[str, List[InvoiceRow]]:
+        """Fetch invoices for many customers with one query per chunk of IDs.
+        
+        Every requested customer gets an entry (empty if they have no
+        invoices), each list ordered newest first like get_invoices_by_customer.
+        """
+        ids = list(dict.fromkeys(customer_ids))
+        invoices = {customer_id: [] for customer_id in ids}
         
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"SELECT * FROM invoices WHERE customer_id = '{customer_id}' ORDER BY created_date DESC"
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                invoice = {
-                    "invoice_id": row[0],
-                    "customer_id": row[1],
-                    "amount": row[2],
-                    "status": row[3],
-                    "created_date": row[4]
-                }
-                invoices.append(invoice)
-            
-            conn.close()
+            with self.pool.connection() as conn:
+                for params in in_chunks(ids):
+                    for row in query(conn, invoice_row, SELECT_INVOICES_FOR_CUSTOMERS_SQL, params):
+                        invoices[row.customer_id].append(row)
         except Exception as ex:
             raise Exception(f"Database error: {ex}")
         
         return invoices
     
+    # Pending + late amount, as checked before closing an account
+    def get_outstanding_balance(self, customer_id: str) -> float:
+        return self.get_invoice_summary(customer_id)["outstanding"]
+    
+    def get_late_invoice_count(self, customer_id: str) -> int:
+        return self.get_invoice_summary(customer_id)["late_count"]
+    
+    # Everything not paid or cancelled counts against the credit limit
+    def get_used_credit(self, customer_id: str) -> float:
+        return self.get_invoice_summary(customer_id)["used_credit"]
+    
+    @timed()
+    def get_invoice_summary(self, customer_id: str) -> Dict:
+        summary = self.summary_cache.get(customer_id)
+        if summary is not None:
+            return summary
+        return self.query_invoice_summary(customer_id)
+    
+    @timed()
+    def query_invoice_summary(self, customer_id: str) -> Dict:
+        """Read the summary from the database and cache it, without checking the cache first."""
+        token = self.summary_cache.token()
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(SUMMARY_SQL, (customer_id,)).fetchone()
+        except Exception as ex:
+            raise Exception(f"Database error: {ex}")
+        
+        summary = {
+            "outstanding": row[1],
+            "used_credit": row[2],
+            "late_count": row[3]
+        }
+        self.summary_cache.put(customer_id, summary, token)
+        return summary
+    
+    @timed()
+    def get_invoice_summaries(self, customer_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Summaries for many customers, one grouped query per chunk of IDs."""
+        summaries = {}
+        ids = []
+        for customer_id in dict.fromkeys(customer_ids):
+            cached = self.summary_cache.get(customer_id)
+            if cached is not None:
+                summaries[customer_id] = cached
+            else:
+                summaries[customer_id] = {"outstanding": 0, "used_credit": 0, "late_count": 0}
+                ids.append(customer_id)
+        
+        token = self.summary_cache.token()
+        try:
+            with self.pool.connection() as conn:
+                for params in in_chunks(ids):
+                    for row in conn.execute(SUMMARIES_FOR_CUSTOMERS_SQL, params):
+                        summaries[row[0]] = {
+                            "outstanding": row[1],
+                            "used_credit": row[2],
+                            "late_count": row[3]
+                        }
+        except Exception as ex:
+            raise Exception(f"Database error: {ex}")
+        
+        for customer_id in ids:
+            self.summary_cache.put(customer_id, summaries[customer_id], token)
+        return summaries
+    
     # No input validation
+    @timed()
     def create_invoice(self, customer_id: str, amount: float, status: str) -> bool:
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"INSERT INTO invoices (customer_id, amount, status, created_date) VALUES ('{customer_id}', {amount}, '{status}', datetime('now'))"
-            cursor.execute(sql)
-            conn.commit()
-            conn.close()
+            with self.pool.connection() as conn:
+                conn.execute(INSERT_INVOICE_SQL, (customer_id, amount, status))
+            self.summary_cache.invalidate(customer_id)
             
             return True
         except Exception as ex:
@@ -108,71 +217,80 @@ class InvoiceDAO:
             return False
     
     # Duplicate code pattern
+    @timed()
     def update_invoice_status(self, invoice_id: str, new_status: str) -> bool:
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"UPDATE invoices SET status = '{new_status}' WHERE invoice_id = '{invoice_id}'"
-            cursor.execute(sql)
-            conn.commit()
-            conn.close()
+            with self.pool.connection() as conn:
+                row = conn.execute(SELECT_INVOICE_CUSTOMER_SQL, (invoice_id,)).fetchone()
+                conn.execute(UPDATE_STATUS_SQL, (new_status, invoice_id))
+            if row:
+                self.summary_cache.invalidate(row[0])
             
             return True
         except Exception as ex:
             print(f"Error: {ex}")
             return False
     
-    # No transaction management for financial operations
+    @timed()
     def delete_invoice(self, invoice_id: str) -> bool:
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"DELETE FROM invoices WHERE invoice_id = '{invoice_id}'"
-            cursor.execute(sql)
-            conn.commit()
-            conn.close()
+            with self.pool.connection() as conn:
+                row = conn.execute(SELECT_INVOICE_CUSTOMER_SQL, (invoice_id,)).fetchone()
+                conn.execute(DELETE_INVOICE_SQL, (invoice_id,))
+            if row:
+                self.summary_cache.invalidate(row[0])
             
             return True
         except Exception as ex:
             print(f"Error: {ex}")
             return False
     
-    # Complex query with multiple vulnerabilities
+    @timed()
     def search_invoices(self, customer_name: str, status: str, 
-                       min_amount: float, max_amount: float) -> List[Dict]:
-        invoices = []
+                       min_amount: float, max_amount: float) -> List[InvoiceSearchRow]:
+        return list(self.iter_search_invoices(customer_name, status, min_amount, max_amount))
+    
+    def iter_search_invoices(self, customer_name: str, status: str,
+                             min_amount: float, max_amount: float,
+                             after: Optional[int] = None,
+                             page_size: int = SEARCH_PAGE_SIZE) -> Iterator[InvoiceSearchRow]:
+        """Yield matching invoices in invoice_id order, one page per query.
+        
+        No connection is held between pages, so a slow or abandoned consumer
+        doesn't tie up the pool.
+        """
+        while True:
+            invoices, after = self.search_invoices_page(
+                customer_name, status, min_amount, max_amount, after, page_size)
+            yield from invoices
+            if after is None:
+                return
+    
+    @timed()
+    def search_invoices_page(self, customer_name: str, status: str,
+                             min_amount: float, max_amount: float,
+                             after: Optional[int] = None,
+                             page_size: int = SEARCH_PAGE_SIZE) -> Tuple[List[InvoiceSearchRow], Optional[int]]:
+        """One page of search results and the token for the next page.
         
+        Pass the returned token back as after; it is None on the last page.
+        """
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: Multiple SQL Injection vulnerabilities
-            sql = f"""SELECT i.*, c.name FROM invoices i 
-                     JOIN customers c ON i.customer_id = c.customer_id 
-                     WHERE c.name LIKE '%{customer_name}%' 
-                     AND i.status = '{status}' 
-                     AND i.amount >= {min_amount} 
-                     AND i.amount <= {max_amount}"""
-            
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                invoice = {
-                    "invoice_id": row[0],
-                    "customer_id": row[1],
-                    "customer_name": row[5],
-                    "amount": row[2],
-                    "status": row[3]
-                }
-                invoices.append(invoice)
-            
-            conn.close()
+            with self.pool.connection() as conn:
+                if self._name_index is None:
+                    self._name_index = has_customer_name_index(conn)
+                sql = SEARCH_INVOICES_SQL
+                if self._name_index and len(customer_name) >= MIN_INDEXED_SEARCH:
+                    # Capped count, so checking a broad term stays cheap
+                    matches = conn.execute(COUNT_NAME_MATCHES_SQL, (
+                        customer_name, MAX_INDEXED_SEARCH_CUSTOMERS + 1)).fetchone()[0]
+                    if matches <= MAX_INDEXED_SEARCH_CUSTOMERS:
+                        sql = SEARCH_INVOICES_INDEXED_SQL
+                invoices = query(conn, invoice_search_row, sql, (
+                    customer_name, status, min_amount, max_amount,
+                    -1 if after is None else after, page_size)).fetchall()
         except Exception as ex:
             raise Exception(f"Database error: {ex}")
         
-        return invoices
+        next_after = invoices[-1].invoice_id if len(invoices) == page_size else None
+        return invoices, next_after
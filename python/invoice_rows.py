@@ -0,0 +1,70 @@
+"""
+Compact row types for invoice query results.
+
+Read-only Mappings that keep their values in __slots__ and are built
+straight from the cursor by a sqlite3 row_factory. They support row["amount"],
+row.get(...), .items(), attribute access and == against a dict.
+
+They are not dicts, though: json.dumps(row) raises TypeError and
+row["amount"] = ... is not allowed. Callers that serialize or modify rows
+from InvoiceDAO must take a copy with to_dict() (or dict(row)) first.
+"""
+
+import sqlite3
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, Sequence
+
+
+class _Row(Mapping):
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def __getitem__(self, key: str):
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._fields
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self._fields}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class InvoiceRow(_Row):
+    __slots__ = _fields = ("invoice_id", "customer_id", "amount", "status", "created_date")
+
+
+class InvoiceSearchRow(_Row):
+    __slots__ = _fields = ("invoice_id", "customer_id", "customer_name", "amount", "status")
+
+
+# row_factory callbacks; the SELECT must list columns in _fields order
+
+def invoice_row(cursor: sqlite3.Cursor, row: tuple) -> InvoiceRow:
+    obj = object.__new__(InvoiceRow)
+    obj.invoice_id, obj.customer_id, obj.amount, obj.status, obj.created_date = row
+    return obj
+
+
+def invoice_search_row(cursor: sqlite3.Cursor, row: tuple) -> InvoiceSearchRow:
+    obj = object.__new__(InvoiceSearchRow)
+    obj.invoice_id, obj.customer_id, obj.customer_name, obj.amount, obj.status = row
+    return obj
+
+
+def query(conn: sqlite3.Connection, row_factory: Callable, sql: str,
+          params: Sequence = ()) -> sqlite3.Cursor:
+    """Execute with row_factory set on the cursor only; pooled connections are shared."""
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor.execute(sql, params)
@@ -0,0 +1,116 @@
+"""
+Background delivery of payment notifications (confirmation emails, fraud alerts).
+
+A bounded queue served by a fixed set of worker threads. submit() blocks
+briefly when the queue is full rather than letting it grow, and shutdown()
+delivers what is already queued. get_notification_queue() returns the
+process-wide queue.
+"""
+
+import atexit
+import queue
+import threading
+from typing import Callable, Dict, Optional
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_SUBMIT_TIMEOUT = 1.0
+
+_STOP = object()
+
+
+class NotificationQueue:
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 submit_timeout: float = DEFAULT_SUBMIT_TIMEOUT):
+        self.submit_timeout = submit_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        # Separate from _lock (the counters) so a submit blocked on a full
+        # queue doesn't hold up the workers
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._workers = [
+            threading.Thread(target=self._run, name=f"notifications-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, send: Callable, *args) -> bool:
+        """Queue send(*args); returns False if the queue stayed full or is shut down."""
+        # Held with the put so shutdown() can't slip its stop sentinels in
+        # between: a notification is either queued ahead of them or refused
+        with self._submit_lock:
+            if self._closed:
+                return False
+            try:
+                # Backpressure: block the caller briefly rather than queue without bound
+                self._queue.put((send, args), timeout=self.submit_timeout)
+                return True
+            except queue.Full:
+                pass
+        with self._lock:
+            self.dropped += 1
+        print(f"Notification queue full, dropped {getattr(send, '__name__', send)}{args}")
+        return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                send, args = item
+                try:
+                    send(*args)
+                    with self._lock:
+                        self.sent += 1
+                except Exception as ex:
+                    with self._lock:
+                        self.failed += 1
+                    print(f"Notification failed: {ex}")
+            finally:
+                self._queue.task_done()
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None):
+        """Stop accepting work; with wait=True, deliver everything already queued first."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Sentinels queue behind pending notifications, so workers drain first
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        if wait:
+            for worker in self._workers:
+                worker.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
+
+
+_shared: Optional[NotificationQueue] = None
+_shared_lock = threading.Lock()
+
+
+def get_notification_queue() -> NotificationQueue:
+    """Return the process-wide queue, creating it once.
+
+    Its workers are shared by every PaymentProcessor that isn't given a queue
+    of its own, and whatever is still queued is delivered at exit.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared._closed:
+            _shared = NotificationQueue()
+            atexit.register(_shared.shutdown)
+        return _shared
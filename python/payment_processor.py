@@ -11,185 +11,228 @@ Purpose: Payment processing module with measurable quality issues
 Focus Area: Complexity metrics, test coverage, security vulnerabilities
 
 Code Health Issues in This File:
-- Cyclomatic complexity of 42 (threshold: 10-15)
-- Manual thread management increasing complexity
-- Deeply nested conditionals (6+ levels)
 - Business logic mixed with infrastructure concerns
 - Zero unit tests on critical validation logic
-- SQL injection vulnerabilities in database operations
 - No input validation on payment amounts
 - Hard-coded configuration values
-- Magic numbers throughout (30, 100, 1000)
+- Magic numbers throughout (100, 1000)
 - Poor error handling and logging
 - No retry logic for transient failures
 """
 
-import sqlite3
-import threading
-import time
-from typing import Dict, Optional
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from billing_metrics import timed
+from db_pool import ConnectionPool, get_pool
+from group_commit import GroupCommitWriter
+from notifications import NotificationQueue, get_notification_queue
+
+INSERT_CARD_PAYMENT_SQL = (
+    "INSERT INTO payments (customer_id, amount, card_last4, status) VALUES (?, ?, ?, 'completed')")
+INSERT_LARGE_PAYMENT_SQL = (
+    "INSERT INTO payments (customer_id, amount, card_last4, auth_code, status) "
+    "VALUES (?, ?, ?, ?, 'pending_review')")
+INSERT_BANK_TRANSFER_SQL = (
+    "INSERT INTO payments (customer_id, amount, account_last4, routing, status) "
+    "VALUES (?, ?, ?, ?, 'processing')")
+INSERT_PAYPAL_SQL = (
+    "INSERT INTO payments (customer_id, amount, paypal_email, status) VALUES (?, ?, ?, 'completed')")
+
+# Rows committed per transaction by process_payments
+DEFAULT_BATCH_SIZE = 1000
+
+# A validated payment: the INSERT to run, its parameters, and the
+# notification (if any) to queue once the row is committed
+PreparedPayment = namedtuple("PreparedPayment", ["sql", "params", "notify"])
+
+# One entry per input of process_payments, in input order
+PaymentResult = namedtuple("PaymentResult", ["index", "success", "error"])
 
 class PaymentProcessor:
-    def __init__(self):
+    def __init__(self, pool: Optional[ConnectionPool] = None,
+                 notifications: Optional[NotificationQueue] = None,
+                 writer: Optional[GroupCommitWriter] = None):
         # Hard-coded credentials - security issue
         self.conn_str = "billing.db"
-        self.threads = []
+        # Same pool as InvoiceDAO for this database unless one is passed in
+        self.pool = pool or get_pool(self.conn_str)
+        # Emails and fraud alerts are delivered off the payment path, by the
+        # process-wide queue unless one is passed in
+        self.notifications = notifications if notifications is not None else get_notification_queue()
+        # Optional group-commit writer, usually shared by many processors, that
+        # coalesces single-payment commits; batches already commit once each
+        self.writer = writer
     
-    # Cyclomatic complexity: 42 (way above threshold of 10-15)
+    @timed()
     def process_payment(self, customer_id: str, amount: float, method: str, 
                        metadata: Dict[str, str]) -> bool:
-        # No input validation
-        if amount > 0:
-            if method == "credit_card":
-                if "card_number" in metadata:
-                    card_num = metadata["card_number"]
-                    if len(card_num) == 16:
-                        if card_num.startswith("4") or card_num.startswith("5"):
-                            # Deeply nested - 6 levels deep
-                            if amount < 100:
-                                return self._process_small_payment(customer_id, amount, card_num)
-                            elif amount < 1000:
-                                return self._process_medium_payment(customer_id, amount, card_num)
-                            else:
-                                if "authorization_code" in metadata:
-                                    return self._process_large_payment(
-                                        customer_id, amount, card_num, 
-                                        metadata["authorization_code"])
-                                else:
-                                    print("Missing auth code")
-                                    return False
-                        else:
-                            print("Unsupported card type")
-                            return False
-                    else:
-                        print("Invalid card length")
-                        return False
-                else:
-                    print("No card number")
-                    return False
-            elif method == "bank_transfer":
-                if "account_number" in metadata:
-                    if "routing_number" in metadata:
-                        return self._process_bank_transfer(
-                            customer_id, amount, 
-                            metadata["account_number"], 
-                            metadata["routing_number"])
-                    else:
-                        print("No routing number")
-                        return False
-                else:
-                    print("No account number")
-                    return False
-            elif method == "paypal":
-                if "email" in metadata:
-                    return self._process_paypal(customer_id, amount, metadata["email"])
-                else:
-                    print("No PayPal email")
-                    return False
-            else:
-                print("Unknown payment method")
-                return False
-        else:
-            print("Invalid amount")
+        payment, error = self._prepare_payment(customer_id, amount, method, metadata)
+        if error:
+            print(error)
             return False
-    
-    # SQL Injection vulnerability - using raw SQL with string concatenation
-    def _process_small_payment(self, customer_id: str, amount: float, card_num: str) -> bool:
+        
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"INSERT INTO payments (customer_id, amount, card_last4, status) VALUES ('{customer_id}', {amount}, '{card_num[-4:]}', 'completed')"
-            cursor.execute(sql)
-            conn.commit()
-            conn.close()
-            
-            return True
+            if self.writer:
+                self.writer.execute(payment.sql, payment.params)
+            else:
+                with self.pool.connection() as conn:
+                    conn.execute(payment.sql, payment.params)
         except Exception as ex:
             print(f"Error: {ex}")
             return False
+        
+        # Returns once the payment row is committed; notifications go out in the background
+        if payment.notify:
+            self.notifications.submit(payment.notify, customer_id, amount)
+        return True
+    
+    @timed()
+    def process_payments(self, payments: Iterable, batch_size: int = DEFAULT_BATCH_SIZE,
+                         notify: bool = True) -> List[PaymentResult]:
+        return list(self.iter_process_payments(payments, batch_size, notify))
     
-    # Manual thread management - infrastructure mixed with business logic
-    def _process_medium_payment(self, customer_id: str, amount: float, card_num: str) -> bool:
-        success = [False]
+    # Streaming bulk form of process_payment. Each item is a dict with
+    # customer_id/amount/method/metadata keys or a tuple in that order.
+    # Items are validated as they are read and every batch_size items (valid
+    # or not, so a run of bad input can't pile up in memory) the valid rows
+    # are written with executemany in a single transaction; results are
+    # yielded in input order as each batch commits.
+    def iter_process_payments(self, payments: Iterable, batch_size: int = DEFAULT_BATCH_SIZE,
+                              notify: bool = True) -> Iterator[PaymentResult]:
+        pending = []  # (index, prepared payment or error, customer_id, amount)
         
-        def process():
-            # Simulate async processing
-            time.sleep(0.1)
-            success[0] = self._process_small_payment(customer_id, amount, card_num)
+        for index, item in enumerate(payments):
+            customer_id = amount = None
+            try:
+                if isinstance(item, dict):
+                    customer_id, amount = item.get("customer_id"), item.get("amount")
+                    method, metadata = item.get("method"), item.get("metadata") or {}
+                else:
+                    customer_id, amount, method, metadata = item
+                payment, error = self._prepare_payment(customer_id, amount, method, metadata)
+            except (TypeError, ValueError) as ex:
+                payment, error = None, f"Invalid payment: {ex}"
+            pending.append((index, payment or error, customer_id, amount))
             
-            # Magic number - 30 second delay
-            if success[0]:
-                time.sleep(30)
-                self._send_confirmation_email(customer_id, amount)
-        
-        t = threading.Thread(target=process)
-        self.threads.append(t)
-        t.start()
-        t.join(timeout=5)  # Magic number - 5 second timeout
+            if len(pending) >= batch_size:
+                yield from self._flush_payments(pending, notify)
+                pending = []
         
-        return success[0]
+        if pending:
+            yield from self._flush_payments(pending, notify)
     
-    def _process_large_payment(self, customer_id: str, amount: float, 
-                              card_num: str, auth_code: str) -> bool:
-        # Duplicate validation logic
-        if len(auth_code) != 6:
-            print("Invalid auth code")
-            return False
+    @timed()
+    def _flush_payments(self, pending: List[Tuple], notify: bool) -> List[PaymentResult]:
+        # Group rows by statement (one per payment method/tier) for executemany
+        groups = {}
+        for _, payment, _, _ in pending:
+            if isinstance(payment, PreparedPayment):
+                groups.setdefault(payment.sql, []).append(payment.params)
         
-        # More SQL injection
-        try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"INSERT INTO payments (customer_id, amount, card_last4, auth_code, status) VALUES ('{customer_id}', {amount}, '{card_num[-4:]}', '{auth_code}', 'pending_review')"
-            cursor.execute(sql)
-            conn.commit()
-            conn.close()
-            
-            # No retry logic for transient failures
-            self._notify_fraud_team(customer_id, amount)
-            return True
-        except Exception as ex:
-            print(f"Error: {ex}")
-            return False
+        row_errors = {}
+        if groups:
+            try:
+                with self.pool.connection() as conn:
+                    for sql, rows in groups.items():
+                        self.pool.executemany(conn, sql, rows)
+            except Exception:
+                # The transaction rolled back; redo it a row at a time so
+                # only the rows that fail are reported as failed
+                row_errors = self._write_payments_each(pending)
+        
+        results = []
+        for index, payment, customer_id, amount in pending:
+            if not isinstance(payment, PreparedPayment):
+                results.append(PaymentResult(index, False, payment))
+            elif index in row_errors:
+                results.append(PaymentResult(index, False, row_errors[index]))
+            else:
+                results.append(PaymentResult(index, True, None))
+                if notify and payment.notify:
+                    self.notifications.submit(payment.notify, customer_id, amount)
+        return results
     
-    def _process_bank_transfer(self, customer_id: str, amount: float, 
-                              account_num: str, routing_num: str) -> bool:
-        # Duplicate code pattern from credit card processing
+    # Slow path of _flush_payments: one transaction with a savepoint per row,
+    # like GroupCommitWriter. Returns {index: error} for the rows not written.
+    def _write_payments_each(self, pending: List[Tuple]) -> Dict[int, str]:
+        errors = {}
         try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
-            
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"INSERT INTO payments (customer_id, amount, account_last4, routing, status) VALUES ('{customer_id}', {amount}, '{account_num[-4:]}', '{routing_num}', 'processing')"
-            cursor.execute(sql)
-            conn.commit()
-            conn.close()
-            
-            return True
+            with self.pool.connection() as conn:
+                # Explicit BEGIN so each RELEASE doesn't commit on its own
+                conn.execute("BEGIN IMMEDIATE")
+                for index, payment, _, _ in pending:
+                    if not isinstance(payment, PreparedPayment):
+                        continue
+                    conn.execute("SAVEPOINT payment_row")
+                    try:
+                        conn.execute(payment.sql, payment.params)
+                    except Exception as ex:
+                        conn.execute("ROLLBACK TO payment_row")
+                        errors[index] = f"Error: {ex}"
+                        print(errors[index])
+                    conn.execute("RELEASE payment_row")
         except Exception as ex:
-            print(f"Error: {ex}")
-            return False
+            # BEGIN or COMMIT failed: nothing in the batch was written
+            error = f"Error: {ex}"
+            print(error)
+            return {index: error for index, payment, _, _ in pending
+                    if isinstance(payment, PreparedPayment)}
+        return errors
     
-    def _process_paypal(self, customer_id: str, amount: float, email: str) -> bool:
-        # More duplicate code
-        try:
-            conn = sqlite3.connect(self.conn_str)
-            cursor = conn.cursor()
+    # Validation shared by the single and batch paths. Returns
+    # (PreparedPayment, None) or (None, reason).
+    def _prepare_payment(self, customer_id: str, amount: float, method: str,
+                         metadata: Dict[str, str]) -> Tuple[Optional[PreparedPayment], Optional[str]]:
+        if not customer_id:
+            return None, "Missing customer ID"
+        # No input validation
+        if not amount > 0:
+            return None, "Invalid amount"
+        
+        if method == "credit_card":
+            if "card_number" not in metadata:
+                return None, "No card number"
+            card_num = metadata["card_number"]
+            if len(card_num) != 16:
+                return None, "Invalid card length"
+            if not (card_num.startswith("4") or card_num.startswith("5")):
+                return None, "Unsupported card type"
             
-            # CRITICAL: SQL Injection vulnerability
-            sql = f"INSERT INTO payments (customer_id, amount, paypal_email, status) VALUES ('{customer_id}', {amount}, '{email}', 'completed')"
-            cursor.execute(sql)
-            conn.commit()
-            conn.close()
+            if amount < 100:
+                return PreparedPayment(
+                    INSERT_CARD_PAYMENT_SQL, (customer_id, amount, card_num[-4:]), None), None
+            if amount < 1000:
+                return PreparedPayment(
+                    INSERT_CARD_PAYMENT_SQL, (customer_id, amount, card_num[-4:]),
+                    self._send_confirmation_email), None
             
-            return True
-        except Exception as ex:
-            print(f"Error: {ex}")
-            return False
+            if "authorization_code" not in metadata:
+                return None, "Missing auth code"
+            auth_code = metadata["authorization_code"]
+            if len(auth_code) != 6:
+                return None, "Invalid auth code"
+            # No retry logic for transient failures
+            return PreparedPayment(
+                INSERT_LARGE_PAYMENT_SQL, (customer_id, amount, card_num[-4:], auth_code),
+                self._notify_fraud_team), None
+        
+        if method == "bank_transfer":
+            if "account_number" not in metadata:
+                return None, "No account number"
+            if "routing_number" not in metadata:
+                return None, "No routing number"
+            return PreparedPayment(
+                INSERT_BANK_TRANSFER_SQL,
+                (customer_id, amount, metadata["account_number"][-4:], metadata["routing_number"]),
+                None), None
+        
+        if method == "paypal":
+            if "email" not in metadata:
+                return None, "No PayPal email"
+            return PreparedPayment(
+                INSERT_PAYPAL_SQL, (customer_id, amount, metadata["email"]), None), None
+        
+        return None, "Unknown payment method"
     
     def _send_confirmation_email(self, customer_id: str, amount: float):
         # Stub - no implementation
@@ -4,15 +4,22 @@ Analyze code health metrics from the Python codebase
 Outputs metrics to metrics.json for dashboard consumption
 """
 
+import argparse
 import ast
+import hashlib
 import json
 import os
 import re
+import sys
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import subprocess
 
+from hotspots import rank_hotspots
+from ownership import DEFAULT_CACHE, DEFAULT_WORKERS, add_ownership
+
 
 def calculate_cyclomatic_complexity(node):
     """Calculate cyclomatic complexity for a function/method"""
@@ -25,6 +32,14 @@ def calculate_cyclomatic_complexity(node):
     return complexity
 
 
+def complexity_rank(complexity: float) -> str:
+    """Map a complexity score to the A-F rank used by radon"""
+    for limit, rank in ((5, 'A'), (10, 'B'), (20, 'C'), (30, 'D'), (40, 'E')):
+        if complexity <= limit:
+            return rank
+    return 'F'
+
+
 def count_lines(node):
     """Count lines in a function/method"""
     if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
@@ -32,63 +47,84 @@ def count_lines(node):
     return 0
 
 
-def analyze_python_files(directory: str = 'python') -> Dict:
-    """Analyze all Python files in the directory"""
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse a 1-based shard spec such as '2/4' into (index, count)"""
+    
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', index must be between 1 and {max(count, 1)}")
+    return index, count
+
+
+def shard_for_path(path: str, shard_count: int) -> int:
+    """Deterministically assign a file path to a 1-based shard"""
+    
+    # Python's hash() is salted per process, so use a stable digest instead
+    digest = hashlib.sha1(path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count + 1
+
+
+def analyze_file(py_file: Path) -> Dict:
+    """Analyze a single Python file and return its file entry"""
+    
+    with open(py_file, 'r', encoding='utf-8') as f:
+        source = f.read()
+    
+    tree = ast.parse(source, filename=str(py_file))
+    
+    file_complexity = 0
+    file_functions = []
+    
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            complexity = calculate_cyclomatic_complexity(node)
+            file_complexity += complexity
+            file_functions.append({
+                'name': node.name,
+                'complexity': complexity,
+                'rank': complexity_rank(complexity),
+                'lines': count_lines(node),
+                'line': node.lineno,
+                'file': py_file.name
+            })
+    
+    file_functions.sort(key=lambda f: f['line'])
+    return {
+        'path': py_file.as_posix(),
+        'complexity': file_complexity,
+        'avg_complexity': round(file_complexity / len(file_functions), 1) if file_functions else 0,
+        'functions': file_functions
+    }
+
+
+def summarize_files(files: Dict[str, Dict]) -> Dict:
+    """Compute totals, maxima and averages from per-file entries
+    
+    Both a single-process run and the shard merge go through here, so
+    merged results are identical to an unsharded run.
+    """
     
     results = {
         'total_complexity': 0,
         'function_count': 0,
         'max_complexity': 0,
-        'files': {},
+        'files': dict(sorted(files.items())),
         'high_complexity_functions': []
     }
     
-    python_dir = Path(directory)
-    if not python_dir.exists():
-        return results
+    for file_info in results['files'].values():
+        results['total_complexity'] += file_info['complexity']
+        for func_info in file_info['functions']:
+            results['function_count'] += 1
+            results['max_complexity'] = max(results['max_complexity'], func_info['complexity'])
+            if func_info['complexity'] > 15:
+                results['high_complexity_functions'].append(func_info)
     
-    for py_file in python_dir.glob('*.py'):
-        try:
-            with open(py_file, 'r', encoding='utf-8') as f:
-                source = f.read()
-            
-            tree = ast.parse(source, filename=str(py_file))
-            
-            file_complexity = 0
-            file_functions = []
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    complexity = calculate_cyclomatic_complexity(node)
-                    lines = count_lines(node)
-                    
-                    file_complexity += complexity
-                    results['function_count'] += 1
-                    
-                    func_info = {
-                        'name': node.name,
-                        'complexity': complexity,
-                        'lines': lines,
-                        'file': py_file.name
-                    }
-                    
-                    file_functions.append(func_info)
-                    
-                    if complexity > results['max_complexity']:
-                        results['max_complexity'] = complexity
-                    
-                    if complexity > 15:
-                        results['high_complexity_functions'].append(func_info)
-            
-            results['files'][py_file.name] = {
-                'complexity': file_complexity,
-                'functions': file_functions
-            }
-            
-            results['total_complexity'] += file_complexity
-            
-        except Exception as e:
-            print(f"Error analyzing {py_file}: {e}")
+    results['high_complexity_functions'].sort(
+        key=lambda f: (-f['complexity'], f['file'], f['line']))
     
     # Calculate average complexity
     if results['function_count'] > 0:
@@ -99,8 +135,64 @@ def analyze_python_files(directory: str = 'python') -> Dict:
     return results
 
 
-def get_git_churn(days: int = 30) -> List[Dict]:
-    """Get git commit statistics for the last N days"""
+def analyze_python_files(directory: str = 'python', shard: Optional[Tuple[int, int]] = None) -> Dict:
+    """Analyze all Python files in the directory, optionally only one shard of them"""
+    
+    files = {}
+    parse_errors = 0
+    
+    python_dir = Path(directory)
+    if python_dir.exists():
+        for py_file in sorted(python_dir.glob('*.py')):
+            if shard and shard_for_path(py_file.as_posix(), shard[1]) != shard[0]:
+                continue
+            try:
+                files[py_file.name] = analyze_file(py_file)
+            except Exception as e:
+                parse_errors += 1
+                print(f"Error analyzing {py_file}: {e}")
+    
+    results = summarize_files(files)
+    results['parse_errors'] = parse_errors
+    return results
+
+
+def format_complexity_report(code_analysis: Dict) -> str:
+    """Render the per-function complexity report in radon's text layout"""
+    
+    lines = []
+    for file_info in code_analysis['files'].values():
+        lines.append(file_info['path'])
+        for func in file_info['functions']:
+            lines.append(f"    F {func['line']} {func['name']} - {func['rank']} ({func['complexity']})")
+    
+    avg = code_analysis['avg_complexity']
+    lines.append('')
+    lines.append(f"{code_analysis['function_count']} blocks (classes, functions, methods) analyzed.")
+    lines.append(f"Average complexity: {complexity_rank(avg)} ({avg})")
+    return '\n'.join(lines) + '\n'
+
+
+def write_complexity_report(code_analysis: Dict, text_path: str = 'complexity_report.txt',
+                            json_path: str = 'complexity_report.json'):
+    """Write the complexity report as text and JSON from a single analysis pass"""
+    
+    with open(text_path, 'w', encoding='utf-8') as f:
+        f.write(format_complexity_report(code_analysis))
+    
+    report = {
+        'avg_complexity': code_analysis['avg_complexity'],
+        'avg_rank': complexity_rank(code_analysis['avg_complexity']),
+        'max_complexity': code_analysis['max_complexity'],
+        'function_count': code_analysis['function_count'],
+        'files': code_analysis['files']
+    }
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def collect_file_changes(days: int = 30) -> Dict[str, List[int]]:
+    """Map each changed Python file to the commit timestamps of the last N days"""
     
     try:
         # Check if we're in a git repository
@@ -110,35 +202,49 @@ def get_git_churn(days: int = 30) -> List[Dict]:
         # Get commits from the last N days
         since_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
         
-        # Get file change statistics
+        # Each commit prints '@<unix time>' followed by the files it touched
         result = subprocess.run(
-            ['git', 'log', f'--since={since_date}', '--name-only', '--pretty=format:'],
+            ['git', 'log', f'--since={since_date}', '--name-only', '--pretty=format:@%ct'],
             capture_output=True,
             text=True,
             check=True
         )
         
-        # Count changes per file
         file_changes = {}
+        commit_time = 0
         for line in result.stdout.split('\n'):
             line = line.strip()
-            if line and line.endswith('.py'):
-                file_changes[line] = file_changes.get(line, 0) + 1
+            if line.startswith('@'):
+                commit_time = int(line[1:])
+            elif line and line.endswith('.py'):
+                file_changes.setdefault(line, []).append(commit_time)
         
-        # Sort by change count
-        sorted_changes = sorted(file_changes.items(), key=lambda x: x[1], reverse=True)
-        
-        return [
-            {'file': file, 'changes': count}
-            for file, count in sorted_changes[:10]
-        ]
+        return file_changes
     
     except subprocess.CalledProcessError:
         print("Not a git repository or git not available")
-        return []
+        return {}
     except Exception as e:
         print(f"Error getting git churn: {e}")
-        return []
+        return {}
+
+
+def summarize_churn(file_changes: Dict[str, List[int]], limit: int = 10) -> List[Dict]:
+    """Return the most frequently changed files"""
+    
+    # Sort by change count
+    sorted_changes = sorted(file_changes.items(), key=lambda x: (-len(x[1]), x[0]))
+    
+    return [
+        {'file': file, 'changes': len(stamps)}
+        for file, stamps in sorted_changes[:limit]
+    ]
+
+
+def get_git_churn(days: int = 30) -> List[Dict]:
+    """Get git commit statistics for the last N days"""
+    
+    return summarize_churn(collect_file_changes(days))
 
 
 def simulate_test_coverage() -> Dict[str, int]:
@@ -158,10 +264,10 @@ def simulate_test_coverage() -> Dict[str, int]:
     }
 
 
-def load_previous_metrics() -> Dict:
+def load_previous_metrics(path: str = 'metrics.json') -> Dict:
     """Load previous metrics to track trends"""
     
-    metrics_file = Path('metrics.json')
+    metrics_file = Path(path)
     if metrics_file.exists():
         try:
             with open(metrics_file, 'r') as f:
@@ -172,6 +278,47 @@ def load_previous_metrics() -> Dict:
     return {}
 
 
+def load_runtime_metrics(path: str = 'runtime_metrics.json') -> Dict:
+    """Load the latency histograms dumped by python/billing_metrics.py, if any"""
+    
+    runtime_file = Path(path)
+    if runtime_file.exists():
+        try:
+            with open(runtime_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading runtime metrics: {e}")
+    
+    return {}
+
+
+def summarize_runtime(runtime_metrics: Dict, limit: int = 10, min_count: int = 5) -> Dict:
+    """Rank instrumented methods and queries together by p95 latency"""
+    
+    operations = []
+    for kind, section in (('method', 'methods'), ('query', 'queries')):
+        for name, stats in runtime_metrics.get(section, {}).items():
+            # A p95 over a handful of calls (startup queries, migrations) is noise
+            if stats.get('count', 0) < min_count:
+                continue
+            operations.append({
+                'name': name,
+                'kind': kind,
+                'count': stats['count'],
+                'mean_ms': stats['mean_ms'],
+                'p50_ms': stats['p50_ms'],
+                'p95_ms': stats['p95_ms'],
+                'p99_ms': stats['p99_ms'],
+                'max_ms': stats['max_ms']
+            })
+    
+    operations.sort(key=lambda item: (item['p95_ms'], item['count']), reverse=True)
+    return {
+        'timestamp': runtime_metrics.get('timestamp'),
+        'slowest': operations[:limit]
+    }
+
+
 def calculate_trends(current_metrics: Dict, previous_metrics: Dict) -> Dict:
     """Calculate weekly trends for the dashboard"""
     
@@ -194,28 +341,24 @@ def calculate_trends(current_metrics: Dict, previous_metrics: Dict) -> Dict:
     return trends
 
 
-def main():
-    """Main analysis function"""
-    
-    print("🔍 Analyzing code health...")
-    
-    # Load previous metrics
-    previous_metrics = load_previous_metrics()
-    
-    # Analyze Python code
-    code_analysis = analyze_python_files('python')
+def build_metrics(code_analysis: Dict, previous_metrics: Dict,
+                  runtime_metrics: Optional[Dict] = None) -> Dict:
+    """Combine code analysis with churn, coverage, runtime latency and trends into metrics.json"""
     
     # Get git churn
-    churn_data = get_git_churn(30)
+    file_changes = collect_file_changes(30)
+    churn_data = summarize_churn(file_changes)
     
     # Get test coverage
     coverage_data = simulate_test_coverage()
     
+    # Rank churn x complexity hotspots
+    hotspots = rank_hotspots(code_analysis['files'], file_changes, coverage_data)
+    
     # Calculate trends
     trends = calculate_trends(code_analysis, previous_metrics)
     
-    # Compile all metrics
-    metrics = {
+    return {
         'timestamp': datetime.now().isoformat(),
         'avg_complexity': code_analysis['avg_complexity'],
         'max_complexity': code_analysis['max_complexity'],
@@ -223,12 +366,29 @@ def main():
         'high_complexity_count': len(code_analysis['high_complexity_functions']),
         'coverage': coverage_data,
         'churn': churn_data,
+        'hotspots': hotspots,
+        'runtime': summarize_runtime(runtime_metrics or {}),
         'trends': trends,
+        'analyzer': code_analysis.get('analyzer', {}),
         'files': code_analysis['files']
     }
+
+
+def write_metrics(code_analysis: Dict, output: str = 'metrics.json',
+                  runtime_path: str = 'runtime_metrics.json'):
+    """Write the complexity report and the final metrics file"""
+    
+    # Load previous metrics
+    previous_metrics = load_previous_metrics(output)
+    runtime_metrics = load_runtime_metrics(runtime_path)
+    
+    # Write the complexity report from the same pass
+    write_complexity_report(code_analysis)
+    
+    metrics = build_metrics(code_analysis, previous_metrics, runtime_metrics)
     
     # Save metrics
-    with open('metrics.json', 'w') as f:
+    with open(output, 'w') as f:
         json.dump(metrics, f, indent=2)
     
     print(f"✅ Analysis complete!")
@@ -236,7 +396,152 @@ def main():
     print(f"   Max Complexity: {metrics['max_complexity']}")
     print(f"   High Complexity Functions: {metrics['high_complexity_count']}")
     print(f"   Files Analyzed: {len(code_analysis['files'])}")
-    print(f"   Churn Hotspots: {len(churn_data)}")
+    print(f"   Churn Hotspots: {len(metrics['churn'])}")
+    print(f"   Runtime Operations: {len(metrics['runtime']['slowest'])}")
+
+
+def write_partial(code_analysis: Dict, shard: Tuple[int, int], output: Optional[str] = None) -> str:
+    """Write one shard's per-file results for a later merge"""
+    
+    index, count = shard
+    output = output or f'metrics.shard-{index}-of-{count}.json'
+    partial = {
+        'shard': {'index': index, 'count': count},
+        'timestamp': datetime.now().isoformat(),
+        'analyzer': code_analysis.get('analyzer', {}),
+        'files': code_analysis['files']
+    }
+    with open(output, 'w') as f:
+        json.dump(partial, f, indent=2)
+    
+    print(f"✅ Shard {index}/{count} complete: {len(code_analysis['files'])} files -> {output}")
+    return output
+
+
+def merge_partials(paths: List[str]) -> Dict:
+    """Combine shard partials into one analysis, checking the shard set is complete"""
+    
+    started = time.perf_counter()
+    files = {}
+    seen = set()
+    expected_count = None
+    shard_stats = []
+    
+    for path in paths:
+        with open(path, 'r') as f:
+            partial = json.load(f)
+        
+        index, count = partial['shard']['index'], partial['shard']['count']
+        if expected_count is None:
+            expected_count = count
+        elif count != expected_count:
+            raise ValueError(f"{path} is shard {index}/{count}, expected N={expected_count}")
+        if index in seen:
+            raise ValueError(f"Shard {index}/{count} given more than once")
+        seen.add(index)
+        shard_stats.append(partial.get('analyzer', {}))
+        
+        for name, file_info in partial['files'].items():
+            if name in files:
+                raise ValueError(f"{name} appears in more than one shard")
+            files[name] = file_info
+    
+    missing = sorted(set(range(1, (expected_count or 0) + 1)) - seen)
+    if missing:
+        raise ValueError(f"Missing shard(s): {', '.join(f'{i}/{expected_count}' for i in missing)}")
+    
+    code_analysis = summarize_files(files)
+    
+    # Shards run in parallel, so wall time is the slowest shard plus the merge
+    code_analysis['analyzer'] = {
+        'duration_seconds': round(max((s.get('duration_seconds', 0) for s in shard_stats), default=0)
+                                  + time.perf_counter() - started, 3),
+        'files_analyzed': len(files),
+        'functions_analyzed': code_analysis['function_count'],
+        'parse_errors': sum(s.get('parse_errors', 0) for s in shard_stats),
+        'shards': expected_count,
+        'blame_cached': sum(s.get('blame_cached', 0) for s in shard_stats),
+        'blame_blamed': sum(s.get('blame_blamed', 0) for s in shard_stats)
+    }
+    return code_analysis
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the analyze (default) and merge subcommands"""
+    
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0].startswith('-') and argv[0] not in ('-h', '--help'):
+        argv.insert(0, 'analyze')
+    
+    parser = argparse.ArgumentParser(description='Analyze code health metrics')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    analyze = subparsers.add_parser('analyze', help='analyze source files (default)')
+    analyze.add_argument('--directory', default='python', help='directory to analyze')
+    analyze.add_argument('--shard', help='only analyze shard i of N (1-based), writing a partial result')
+    analyze.add_argument('-o', '--output', help='output file (default metrics.json, or a shard partial)')
+    analyze.add_argument('--blame-workers', type=int, default=DEFAULT_WORKERS,
+                         help='concurrent git blame processes (0 skips ownership)')
+    analyze.add_argument('--blame-cache', default=DEFAULT_CACHE,
+                         help='blame cache file keyed by blob SHA')
+    analyze.add_argument('--runtime-metrics', default='runtime_metrics.json',
+                         help='latency histograms from the billing modules, if present')
+    
+    merge = subparsers.add_parser('merge', help='merge shard partials into metrics.json')
+    merge.add_argument('partials', nargs='+', help='partial result files from --shard runs')
+    merge.add_argument('-o', '--output', default='metrics.json', help='output metrics file')
+    merge.add_argument('--runtime-metrics', default='runtime_metrics.json',
+                       help='latency histograms from the billing modules, if present')
+    
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main analysis function"""
+    
+    args = parse_args(argv)
+    
+    try:
+        if args.command == 'merge':
+            print(f"🔗 Merging {len(args.partials)} shard results...")
+            write_metrics(merge_partials(args.partials), args.output, args.runtime_metrics)
+            return
+        
+        shard = parse_shard(args.shard) if args.shard else None
+    except (OSError, KeyError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    print("🔍 Analyzing code health...")
+    
+    # Analyze Python code
+    started = time.perf_counter()
+    code_analysis = analyze_python_files(args.directory, shard)
+    
+    # Per-shard, since blame is the expensive part of the run
+    blame_stats = {}
+    if args.blame_workers > 0:
+        blame_cache = args.blame_cache
+        if shard and blame_cache == DEFAULT_CACHE:
+            # Each shard prunes the cache to its own blobs, so keep them apart
+            blame_cache = DEFAULT_CACHE.replace('.json', f'.shard-{shard[0]}-of-{shard[1]}.json')
+        blame_stats = add_ownership(code_analysis['files'], args.blame_workers, blame_cache)
+    
+    # Run statistics for the OpenMetrics exporter
+    code_analysis['analyzer'] = {
+        'duration_seconds': round(time.perf_counter() - started, 3),
+        'files_analyzed': len(code_analysis['files']),
+        'functions_analyzed': code_analysis['function_count'],
+        'parse_errors': code_analysis['parse_errors'],
+        'shards': shard[1] if shard else 1,
+        'blame_cached': blame_stats.get('cached', 0),
+        'blame_blamed': blame_stats.get('blamed', 0)
+    }
+    
+    if shard:
+        write_partial(code_analysis, shard, args.output)
+    else:
+        write_metrics(code_analysis, args.output or 'metrics.json', args.runtime_metrics)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Drive a mixed billing workload against a billing.db and report latency
+Worker threads pick operations (payments, credit checks, invoice searches...)
+by weight for a fixed duration; throughput and p50/p95/p99 latency per
+operation are written as JSON. Build a database first with
+generate_billing_db.py
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'python'))
+
+from billing_metrics import RUNTIME_METRICS_FILE, get_registry
+from customer_servlet import CustomerServlet
+from customer_store import SqliteCustomerStore
+from db_pool import get_pool
+from group_commit import GroupCommitWriter
+from invoice_dao import InvoiceDAO
+from payment_processor import PaymentProcessor
+
+DEFAULT_MIX = 'payment=0.25,credit_check=0.3,credit_increase=0.05,search=0.15,invoice_list=0.25'
+INVOICE_STATUSES = ['paid', 'pending', 'late', 'cancelled']
+SEARCH_PAGE_SIZE = 50
+# Customer names sampled for search terms
+SEARCH_SAMPLE = 1000
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse 'operation=weight,...' into a weight per operation"""
+
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 0)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Workload:
+    """The billing objects under test and one callable per operation
+
+    Each operation takes the worker's RNG and returns False when the call
+    reports a failure (a payment that was not written); exceptions count as
+    errors too.
+    """
+
+    def __init__(self, database: str, group_commit: bool = False):
+        self.pool = get_pool(database)
+        self.writer = GroupCommitWriter(self.pool) if group_commit else None
+        self.dao = InvoiceDAO(pool=self.pool)
+        self.processor = PaymentProcessor(pool=self.pool, writer=self.writer)
+        self.servlet = CustomerServlet(store=SqliteCustomerStore(self.pool), invoice_dao=self.dao)
+
+        with self.pool.connection() as conn:
+            self.customer_ids = [row[0] for row in conn.execute(
+                "SELECT customer_id FROM customers WHERE status = 'active'")]
+            names = [row[0] for row in conn.execute(
+                'SELECT name FROM customers ORDER BY random() LIMIT ?', (SEARCH_SAMPLE,))]
+        if not self.customer_ids:
+            raise SystemExit(f'No active customers in {database}; run generate_billing_db.py first')
+        # Search by a real first and last name, like a support agent would
+        self.search_terms = [' '.join(name.split()[:2]) for name in names if name.strip()] or ['a']
+
+        self.operations: Dict[str, Callable[[random.Random], bool]] = {
+            'payment': self.payment,
+            'credit_check': self.credit_check,
+            'credit_increase': self.credit_increase,
+            'search': self.search,
+            'invoice_list': self.invoice_list,
+        }
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        # Deliver queued notifications now, while stdout is still redirected
+        self.processor.notifications.shutdown(wait=True)
+
+    def payment(self, rng: random.Random) -> bool:
+        customer_id = rng.choice(self.customer_ids)
+        amount = round(rng.lognormvariate(4.5, 1.0), 2)
+        method = rng.choices(['credit_card', 'bank_transfer', 'paypal'], [0.6, 0.25, 0.15])[0]
+        if method == 'credit_card':
+            metadata = {'card_number': f'4{rng.randrange(10 ** 15):015d}',
+                        'authorization_code': f'{rng.randrange(10 ** 6):06d}'}
+        elif method == 'bank_transfer':
+            metadata = {'account_number': f'{rng.randrange(10 ** 10):010d}',
+                        'routing_number': f'{rng.randrange(10 ** 9):09d}'}
+        else:
+            metadata = {'email': f'{customer_id.lower()}@example.com'}
+        return self.processor.process_payment(customer_id, amount, method, metadata)
+
+    def credit_check(self, rng: random.Random) -> bool:
+        self.servlet.calculate_available_credit(rng.choice(self.customer_ids))
+        return True
+
+    def credit_increase(self, rng: random.Random) -> bool:
+        # A refusal is a business outcome, not a failure
+        self.servlet.approve_credit_increase(rng.choice(self.customer_ids), rng.choice([100, 500, 1000]))
+        return True
+
+    def search(self, rng: random.Random) -> bool:
+        low = rng.choice([0, 50, 100, 500])
+        self.dao.search_invoices_page(rng.choice(self.search_terms), rng.choice(INVOICE_STATUSES),
+                                      low, low * 10 + 1000, page_size=SEARCH_PAGE_SIZE)
+        return True
+
+    def invoice_list(self, rng: random.Random) -> bool:
+        self.dao.get_invoices_by_customer(rng.choice(self.customer_ids))
+        return True
+
+
+def run_worker(workload: Workload, mix: Dict[str, float], deadline: float, seed: int,
+               results: Dict[str, Dict], lock: threading.Lock):
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            ok = workload.operations[name](rng)
+        except Exception:
+            ok = False
+        latencies[name].append(time.perf_counter() - start)
+        if not ok:
+            errors[name] += 1
+
+    # Merge once at the end so the timed loop shares nothing between threads
+    with lock:
+        for name in names:
+            results[name]['latencies'].extend(latencies[name])
+            results[name]['errors'] += errors[name]
+
+
+def summarize(results: Dict[str, Dict], elapsed: float) -> Dict:
+    operations = {}
+    total_count = total_errors = 0
+    for name, result in results.items():
+        latencies = sorted(result['latencies'])
+        count = len(latencies)
+        total_count += count
+        total_errors += result['errors']
+        operations[name] = {
+            'count': count,
+            'errors': result['errors'],
+            'throughput_per_second': round(count / elapsed, 1),
+            'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3) if count else 0.0,
+        }
+    return {
+        'operations': operations,
+        'total': {
+            'count': total_count,
+            'errors': total_errors,
+            'throughput_per_second': round(total_count / elapsed, 1),
+        },
+    }
+
+
+def run_load_test(database: str, threads: int = 8, duration: float = 10.0,
+                  mix: Optional[Dict[str, float]] = None, seed: int = 42,
+                  group_commit: bool = False, verbose: bool = False) -> Dict:
+    mix = mix or parse_mix(DEFAULT_MIX)
+    workload = Workload(database, group_commit)
+    unknown = set(mix) - set(workload.operations)
+    if unknown:
+        workload.close()
+        raise ValueError(f"Unknown operations: {', '.join(sorted(unknown))}")
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+
+    results = {name: {'latencies': [], 'errors': 0} for name in mix}
+    lock = threading.Lock()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            # The billing modules print on every notification; keep the report readable
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        start = time.perf_counter()
+        deadline = start + duration
+        workers = [threading.Thread(target=run_worker, name=f'load-{i}',
+                                    args=(workload, mix, deadline, seed + i, results, lock))
+                   for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        workload.close()
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'database': database,
+        'threads': threads,
+        'duration_seconds': round(elapsed, 2),
+        'group_commit': group_commit,
+        'mix': mix,
+    }
+    report.update(summarize(results, elapsed))
+    report['summary_cache'] = workload.dao.summary_cache.stats()
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Load test the billing modules')
+    parser.add_argument('--database', default='billing.db', help='database built by generate_billing_db.py')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='operation weights as name=weight,...')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--group-commit', action='store_true',
+                        help='route single payments through a GroupCommitWriter')
+    parser.add_argument('-o', '--output', default='load_test_results.json', help='JSON report file')
+    parser.add_argument('--runtime-metrics', default=RUNTIME_METRICS_FILE,
+                        help="where to dump the billing modules' own latency histograms")
+    parser.add_argument('--verbose', action='store_true', help="show the billing modules' own output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if not os.path.exists(args.database):
+        sys.exit(f'{args.database} not found; run scripts/generate_billing_db.py first')
+
+    try:
+        report = run_load_test(args.database, args.threads, args.duration, parse_mix(args.mix),
+                               args.seed, args.group_commit, args.verbose)
+    except ValueError as ex:
+        sys.exit(str(ex))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    # Per-method and per-query histograms recorded by billing_metrics during the run
+    get_registry().dump(args.runtime_metrics)
+
+    print(f"✅ {report['total']['count']} operations in {report['duration_seconds']}s "
+          f"({report['total']['throughput_per_second']}/s, {report['total']['errors']} errors)")
+    for name, stats in sorted(report['operations'].items()):
+        print(f"   {name:<16} {stats['throughput_per_second']:>9}/s  p50 {stats['p50_ms']:>8}ms  "
+              f"p95 {stats['p95_ms']:>8}ms  p99 {stats['p99_ms']:>8}ms")
+    print(f'   Report: {args.output} (runtime metrics: {args.runtime_metrics})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Export code health metrics in Prometheus/OpenMetrics text format
+Reads the latest metrics.json written by analyze_code_health.py; a scrape
+only re-renders when that file changes and never re-runs the analysis
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'code_health'
+
+
+def escape_label(value) -> str:
+    """Escape a label value per the OpenMetrics text format"""
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value) -> str:
+    """Render a sample value without losing precision"""
+
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def format_family(name: str, help_text: str, samples: List[Tuple[Dict, float]]) -> List[str]:
+    """Render one gauge family with its HELP/TYPE header"""
+
+    lines = [f'# TYPE {PREFIX}_{name} gauge', f'# HELP {PREFIX}_{name} {help_text}']
+    for labels, value in samples:
+        label_str = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+        label_str = f'{{{label_str}}}' if label_str else ''
+        lines.append(f'{PREFIX}_{name}{label_str} {format_value(value)}')
+    return lines
+
+
+def render_openmetrics(metrics: Dict) -> str:
+    """Render a metrics.json document as OpenMetrics text"""
+
+    lines = []
+
+    def family(name, help_text, samples):
+        if samples:
+            lines.extend(format_family(name, help_text, samples))
+
+    def scalar(name, help_text, value):
+        if value is not None:
+            family(name, help_text, [({}, value)])
+
+    scalar('avg_complexity', 'Average cyclomatic complexity per function.',
+           metrics.get('avg_complexity'))
+    scalar('max_complexity', 'Highest cyclomatic complexity of any function.',
+           metrics.get('max_complexity'))
+    scalar('functions', 'Number of functions analyzed.', metrics.get('function_count'))
+    scalar('high_complexity_functions', 'Functions with complexity above 15.',
+           metrics.get('high_complexity_count'))
+
+    family('coverage_percent', 'Test coverage by module.',
+           [({'module': module}, percent) for module, percent in sorted(metrics.get('coverage', {}).items())])
+    family('churn_changes', 'Commits touching the file in the last 30 days.',
+           [({'file': item['file']}, item['changes']) for item in metrics.get('churn', [])])
+    family('file_complexity', 'Total cyclomatic complexity per file.',
+           [({'file': info.get('path', name)}, info['complexity'])
+            for name, info in sorted(metrics.get('files', {}).items())])
+    family('hotspot_score', 'Churn x complexity x coverage gap hotspot score (0-100).',
+           [({'file': item['file']}, item['score'])
+            for item in metrics.get('hotspots', {}).get('files', [])])
+    family('runtime_p95_seconds', 'p95 latency of the slowest instrumented billing methods and queries.',
+           [({'operation': item['name'], 'kind': item['kind']}, item['p95_ms'] / 1000)
+            for item in metrics.get('runtime', {}).get('slowest', [])])
+
+    analyzer = metrics.get('analyzer', {})
+    scalar('analyzer_duration_seconds', 'Wall time of the last analysis run.',
+           analyzer.get('duration_seconds'))
+    scalar('analyzer_files', 'Files analyzed in the last run.', analyzer.get('files_analyzed'))
+    scalar('analyzer_parse_errors', 'Files that failed to parse in the last run.',
+           analyzer.get('parse_errors'))
+    scalar('analyzer_shards', 'Shards the last run was split into.', analyzer.get('shards'))
+    family('analyzer_blame_files', 'Files resolved from the blame cache or by running git blame.',
+           [({'source': 'cache'}, analyzer['blame_cached']), ({'source': 'git'}, analyzer['blame_blamed'])]
+           if 'blame_cached' in analyzer else [])
+
+    if metrics.get('timestamp'):
+        try:
+            finished = datetime.fromisoformat(metrics['timestamp']).timestamp()
+            scalar('analyzer_last_run_timestamp_seconds', 'Unix time the metrics were written.', finished)
+        except ValueError:
+            pass
+
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsSnapshot:
+    """Keep the rendered exposition in sync with metrics.json
+
+    The file is only re-read and re-rendered when its mtime or size changes,
+    so scrapes are a stat() call plus returning a cached string.
+    """
+
+    def __init__(self, path: str = 'metrics.json'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._text = '# EOF\n'
+
+    def get(self) -> str:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self._text
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                try:
+                    with open(self.path, 'r') as f:
+                        self._text = render_openmetrics(json.load(f))
+                    self._signature = signature
+                except ValueError as e:
+                    # Half-written file; keep serving the previous snapshot
+                    print(f"⚠️  Could not read {self.path}: {e}")
+            return self._text
+
+
+def serve(snapshot: MetricsSnapshot, host: str, port: int):
+    """Serve the snapshot at /metrics until interrupted"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = snapshot.get().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"📡 Serving {snapshot.path} at http://{host}:{port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Export code health metrics as OpenMetrics')
+    parser.add_argument('--metrics', default='metrics.json', help='metrics file to export')
+    parser.add_argument('-o', '--output', help='write the exposition to this file')
+    parser.add_argument('--serve', action='store_true', help='serve /metrics over HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='address to bind when serving')
+    parser.add_argument('--port', type=int, default=9464, help='port to bind when serving')
+    args = parser.parse_args(argv)
+
+    snapshot = MetricsSnapshot(args.metrics)
+
+    if args.serve:
+        serve(snapshot, args.host, args.port)
+        return
+
+    if not os.path.exists(args.metrics):
+        print(f"❌ Error: {args.metrics} not found!")
+        sys.exit(1)
+
+    text = snapshot.get()
+    if args.output:
+        # Write then rename so a file-based scraper never sees a partial file
+        tmp = f'{args.output}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, args.output)
+        print(f"✅ OpenMetrics written to {args.output}")
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic billing.db for load testing the billing modules
+Customers, invoices and payments are drawn from a seeded RNG with configurable
+volumes and status/method mixes, so the same arguments always build the same
+database; the schema comes from billing_schema so it matches production
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'python'))
+
+from billing_schema import migrate
+from customer_store import SqliteCustomerStore
+from db_pool import ConnectionPool, DatabaseConfig
+
+DEFAULT_CUSTOMER_STATUS = 'active=0.9,suspended=0.05,closed=0.05'
+DEFAULT_INVOICE_STATUS = 'paid=0.6,pending=0.25,late=0.1,cancelled=0.05'
+DEFAULT_PAYMENT_METHOD = 'credit_card=0.6,bank_transfer=0.25,paypal=0.15'
+
+# Rows per executemany transaction
+BATCH_SIZE = 10000
+
+INSERT_INVOICE_SQL = 'INSERT INTO invoices (customer_id, amount, status, created_date) VALUES (?, ?, ?, ?)'
+INSERT_PAYMENT_SQL = (
+    'INSERT INTO payments (customer_id, amount, card_last4, auth_code, account_last4, routing, '
+    'paypal_email, status, created_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+
+FIRST_NAMES = ['Ava', 'Ben', 'Chloe', 'Daniel', 'Elena', 'Farid', 'Grace', 'Hiro', 'Isla', 'Jamal',
+               'Kofi', 'Lena', 'Mateo', 'Nora', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sven', 'Tara']
+LAST_NAMES = ['Anders', 'Brooks', 'Castillo', 'Dubois', 'Eze', 'Fischer', 'Garcia', 'Haddad', 'Ito',
+              'Jensen', 'Kowalski', 'Larsen', 'Moreau', 'Nakamura', 'Okafor', 'Patel', 'Rossi',
+              'Schmidt', 'Tanaka', 'Walsh']
+COMPANY_SUFFIXES = ['', '', '', ' LLC', ' Inc', ' Consulting', ' Supply']
+CREDIT_LIMITS = [500, 1000, 2500, 5000, 7500, 10000]
+
+
+def parse_distribution(spec: str) -> Tuple[List[str], List[float]]:
+    """Parse 'name=weight,...' into parallel choice/weight lists"""
+
+    names, weights = [], []
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if not name.strip() or not weight:
+            raise argparse.ArgumentTypeError(f'expected name=weight pairs, got {spec!r}')
+        names.append(name.strip())
+        weights.append(float(weight))
+    if sum(weights) <= 0:
+        raise argparse.ArgumentTypeError(f'weights must add up to more than 0 in {spec!r}')
+    return names, weights
+
+
+def customer_id(number: int) -> str:
+    return f'C{number:08d}'
+
+
+def random_timestamp(rng: random.Random, now: datetime, days: int) -> str:
+    return (now - timedelta(seconds=rng.randrange(days * 86400))).isoformat(sep=' ', timespec='seconds')
+
+
+def generate_customers(rng: random.Random, count: int, statuses: Tuple[List[str], List[float]],
+                       now: datetime, days: int) -> Iterator[Dict]:
+    names, weights = statuses
+    for number in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        status = rng.choices(names, weights)[0]
+        created = now - timedelta(seconds=rng.randrange(days * 86400))
+        yield {
+            'customer_id': customer_id(number),
+            'name': f'{first} {last}{rng.choice(COMPANY_SUFFIXES)}',
+            'email': f'{first.lower()}.{last.lower()}{number}@example.com',
+            'phone': f'555-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}',
+            'age': rng.randint(16, 90),
+            'credit_limit': rng.choice(CREDIT_LIMITS),
+            'status': status,
+            'created_date': created,
+            'closed_date': created + timedelta(days=rng.randrange(30, 365)) if status == 'closed' else None,
+            'close_reason': 'generated' if status == 'closed' else None,
+        }
+
+
+def invoice_amount(rng: random.Random) -> float:
+    # Long-tailed like real invoices: median around $150, occasional five figures
+    return round(min(rng.lognormvariate(5.0, 1.1), 50000.0), 2)
+
+
+def generate_invoices(rng: random.Random, count: int, customers: int,
+                      statuses: Tuple[List[str], List[float]], now: datetime, days: int) -> Iterator[Tuple]:
+    names, weights = statuses
+    for _ in range(count):
+        yield (customer_id(rng.randint(1, customers)), invoice_amount(rng),
+               rng.choices(names, weights)[0], random_timestamp(rng, now, days))
+
+
+def generate_payments(rng: random.Random, count: int, customers: int,
+                      methods: Tuple[List[str], List[float]], now: datetime, days: int) -> Iterator[Tuple]:
+    """Payment rows shaped like the ones PaymentProcessor writes for each method and tier"""
+
+    names, weights = methods
+    for _ in range(count):
+        number = rng.randint(1, customers)
+        amount = invoice_amount(rng)
+        method = rng.choices(names, weights)[0]
+        card_last4 = auth_code = account_last4 = routing = paypal_email = None
+        if method == 'credit_card':
+            card_last4 = f'{rng.randrange(10000):04d}'
+            if amount >= 1000:
+                auth_code = f'{rng.randrange(1000000):06d}'
+                status = 'pending_review'
+            else:
+                status = 'completed'
+        elif method == 'bank_transfer':
+            account_last4 = f'{rng.randrange(10000):04d}'
+            routing = f'{rng.randrange(10 ** 9):09d}'
+            status = 'processing'
+        else:
+            paypal_email = f'payer{number}@example.com'
+            status = 'completed'
+        yield (customer_id(number), amount, card_last4, auth_code, account_last4, routing,
+               paypal_email, status, random_timestamp(rng, now, days))
+
+
+def insert_batches(pool: ConnectionPool, sql: str, rows: Iterator[Tuple]) -> int:
+    """executemany in BATCH_SIZE transactions so memory stays flat at any volume"""
+
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            with pool.connection() as conn:
+                pool.executemany(conn, sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        with pool.connection() as conn:
+            pool.executemany(conn, sql, batch)
+        count += len(batch)
+    return count
+
+
+def generate(database: str, customers: int, invoices: int, payments: int,
+             customer_status: str = DEFAULT_CUSTOMER_STATUS,
+             invoice_status: str = DEFAULT_INVOICE_STATUS,
+             payment_method: str = DEFAULT_PAYMENT_METHOD,
+             days: int = 365, seed: int = 42) -> Dict:
+    """Build the database and return row counts and timings"""
+
+    rng = random.Random(seed)
+    # Reproducible for a given seed, but anchored to today so "late" looks recent
+    now = datetime.now().replace(microsecond=0)
+    # Durability doesn't matter while generating; the file stays in WAL mode
+    pool = ConnectionPool(database, max_size=1, config=DatabaseConfig(synchronous='OFF'))
+    try:
+        with pool.connection() as conn:
+            migrate(conn)
+
+        timings = {}
+        start = time.perf_counter()
+        customer_count = SqliteCustomerStore(pool).bulk_load(
+            generate_customers(rng, customers, parse_distribution(customer_status), now, days))
+        timings['customers'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        invoice_count = insert_batches(pool, INSERT_INVOICE_SQL, generate_invoices(
+            rng, invoices, customers, parse_distribution(invoice_status), now, days))
+        timings['invoices'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        payment_count = insert_batches(pool, INSERT_PAYMENT_SQL, generate_payments(
+            rng, payments, customers, parse_distribution(payment_method), now, days))
+        timings['payments'] = time.perf_counter() - start
+
+        with pool.connection() as conn:
+            conn.execute('ANALYZE')
+    finally:
+        pool.close()
+
+    return {
+        'database': database,
+        'customers': customer_count,
+        'invoices': invoice_count,
+        'payments': payment_count,
+        'seconds': {name: round(value, 2) for name, value in timings.items()},
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Generate a synthetic billing database')
+    parser.add_argument('-o', '--database', default='billing.db', help='database file to create')
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--invoices', type=int, default=100000)
+    parser.add_argument('--payments', type=int, default=50000)
+    parser.add_argument('--customer-status', default=DEFAULT_CUSTOMER_STATUS,
+                        help='customer status weights as name=weight,...')
+    parser.add_argument('--invoice-status', default=DEFAULT_INVOICE_STATUS,
+                        help='invoice status weights as name=weight,...')
+    parser.add_argument('--payment-method', default=DEFAULT_PAYMENT_METHOD,
+                        help='payment method weights as name=weight,...')
+    parser.add_argument('--days', type=int, default=365, help='spread created dates over this many days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='replace an existing database file')
+    args = parser.parse_args(argv)
+
+    if args.customers < 1:
+        parser.error('--customers must be at least 1')
+    for spec in (args.customer_status, args.invoice_status, args.payment_method):
+        try:
+            parse_distribution(spec)
+        except argparse.ArgumentTypeError as ex:
+            parser.error(str(ex))
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    if os.path.exists(args.database):
+        if not args.force:
+            sys.exit(f'{args.database} already exists; pass --force to replace it')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    result = generate(args.database, args.customers, args.invoices, args.payments,
+                      args.customer_status, args.invoice_status, args.payment_method,
+                      args.days, args.seed)
+    print(f"✅ {result['database']}: {result['customers']} customers, "
+          f"{result['invoices']} invoices, {result['payments']} payments "
+          f"in {sum(result['seconds'].values()):.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Rank churn x complexity hotspots for files and functions
+Scores are computed over columnar arrays so large repos rank quickly;
+NumPy is used when installed, with a pure-Python fallback
+"""
+
+import heapq
+import time
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None
+
+
+# A change this many days old counts half as much as one made today
+HALF_LIFE_DAYS = 14.0
+
+# Fully covered code still carries some risk when it churns
+MIN_COVERAGE_GAP = 0.1
+
+# Coverage assumed for files missing from the coverage report
+DEFAULT_COVERAGE = 0
+
+TOP_K = 10
+
+
+def decayed_churn(file_index: Sequence[int], timestamps: Sequence[float], file_count: int,
+                  now: Optional[float] = None, half_life_days: float = HALF_LIFE_DAYS) -> Sequence[float]:
+    """Sum recency-weighted changes per file
+
+    file_index and timestamps are parallel columns with one entry per
+    (commit, file) change; each change is weighted 0.5 ** (age / half_life).
+    """
+
+    now = time.time() if now is None else now
+    half_life = half_life_days * 86400.0
+
+    if np is not None:
+        ages = np.maximum(now - np.asarray(timestamps, dtype=np.float64), 0.0)
+        weights = np.exp2(-ages / half_life)
+        return np.bincount(np.asarray(file_index, dtype=np.int64), weights=weights,
+                           minlength=file_count)
+
+    totals = [0.0] * file_count
+    for index, ts in zip(file_index, timestamps):
+        totals[index] += 2.0 ** (-max(now - ts, 0.0) / half_life)
+    return totals
+
+
+def hotspot_scores(churn: Sequence[float], complexity: Sequence[float],
+                   coverage: Sequence[float]) -> Sequence[float]:
+    """Score rows 0-100 as normalized churn x normalized complexity x coverage gap"""
+
+    if np is not None:
+        churn = np.asarray(churn, dtype=np.float64)
+        complexity = np.asarray(complexity, dtype=np.float64)
+        gap = np.maximum(1.0 - np.asarray(coverage, dtype=np.float64) / 100.0, MIN_COVERAGE_GAP)
+        churn_max = churn.max() if churn.size else 0.0
+        complexity_max = complexity.max() if complexity.size else 0.0
+        if churn_max <= 0 or complexity_max <= 0:
+            return np.zeros(churn.shape)
+        return np.round(100.0 * (churn / churn_max) * (complexity / complexity_max) * gap, 1)
+
+    churn_max = max(churn, default=0.0)
+    complexity_max = max(complexity, default=0.0)
+    if churn_max <= 0 or complexity_max <= 0:
+        return [0.0] * len(churn)
+    return [
+        round(100.0 * (ch / churn_max) * (cx / complexity_max)
+              * max(1.0 - cov / 100.0, MIN_COVERAGE_GAP), 1)
+        for ch, cx, cov in zip(churn, complexity, coverage)
+    ]
+
+
+def top_k(scores: Sequence[float], k: int = TOP_K) -> List[int]:
+    """Return the indices of the k highest non-zero scores, best first"""
+
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    if np is not None:
+        scores = np.asarray(scores)
+        # Partitioning is O(n); only the k survivors get fully sorted. Ties at
+        # the cut-off keep the lowest indices so both paths agree.
+        threshold = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:k - above.size]
+        candidates = np.concatenate((above, ties))
+        ordered = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [int(i) for i in ordered if scores[i] > 0]
+
+    best = heapq.nlargest(k, range(n), key=lambda i: (scores[i], -i))
+    return [i for i in best if scores[i] > 0]
+
+
+def _take(column: Sequence, rows: List[int]) -> Sequence:
+    """Gather column values for the given row indices"""
+
+    if np is not None:
+        return np.asarray(column)[np.asarray(rows, dtype=np.int64)] if rows else np.zeros(0)
+    return [column[row] for row in rows]
+
+
+def rank_hotspots(files: Dict[str, Dict], changes: Dict[str, List[float]],
+                  coverage: Dict[str, float], k: int = TOP_K,
+                  now: Optional[float] = None) -> Dict[str, List[Dict]]:
+    """Rank file and function hotspots from analysis, churn history and coverage
+
+    files is the analyzer's per-file section, changes maps repo paths to the
+    commit timestamps that touched them, and coverage maps file names to
+    percent covered.
+    """
+
+    names = list(files)
+    paths = [files[name].get('path', name) for name in names]
+    row_of_path = {path: row for row, path in enumerate(paths)}
+
+    # Flatten change history into (file row, timestamp) columns
+    file_index, timestamps = [], []
+    for path, stamps in changes.items():
+        row = row_of_path.get(path)
+        if row is not None:
+            file_index.extend([row] * len(stamps))
+            timestamps.extend(stamps)
+
+    file_churn = decayed_churn(file_index, timestamps, len(names), now)
+    file_coverage = [coverage.get(name, DEFAULT_COVERAGE) for name in names]
+    change_counts = [len(changes.get(path, ())) for path in paths]
+
+    file_scores = hotspot_scores(file_churn, [files[name]['complexity'] for name in names],
+                                 file_coverage)
+
+    # Function rows inherit churn and coverage from their file
+    func_rows, func_file_rows, func_complexity = [], [], []
+    for row, name in enumerate(names):
+        for func in files[name]['functions']:
+            func_rows.append((row, func))
+            func_file_rows.append(row)
+            func_complexity.append(func['complexity'])
+
+    func_churn = _take(file_churn, func_file_rows)
+    func_coverage = _take(file_coverage, func_file_rows)
+    func_scores = hotspot_scores(func_churn, func_complexity, func_coverage)
+
+    return {
+        'files': [
+            {
+                'file': paths[i],
+                'score': float(file_scores[i]),
+                'changes': change_counts[i],
+                'complexity': files[names[i]]['complexity'],
+                'coverage': file_coverage[i]
+            }
+            for i in top_k(file_scores, k)
+        ],
+        'functions': [
+            {
+                'file': paths[func_rows[i][0]],
+                'name': func_rows[i][1]['name'],
+                'line': func_rows[i][1].get('line'),
+                'score': float(func_scores[i]),
+                'changes': change_counts[func_rows[i][0]],
+                'complexity': func_rows[i][1]['complexity'],
+                'coverage': float(func_coverage[i])
+            }
+            for i in top_k(func_scores, k)
+        ]
+    }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Collect git-blame ownership metrics for analyzed files
+Blame runs on a bounded thread pool and results are cached by blob SHA,
+so files unchanged since the last run are never re-blamed
+"""
+
+import json
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_WORKERS = 4
+DEFAULT_CACHE = '.cache/blame_cache.json'
+
+# Bump when the cached run format changes
+CACHE_VERSION = 1
+
+
+def get_blob_shas(paths: List[str]) -> Dict[str, str]:
+    """Map each path tracked at HEAD to its blob SHA"""
+
+    if not paths:
+        return {}
+
+    result = subprocess.run(
+        ['git', 'ls-tree', 'HEAD', '--'] + paths,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    shas = {}
+    for line in result.stdout.splitlines():
+        # <mode> blob <sha>\t<path>
+        meta, _, path = line.partition('\t')
+        parts = meta.split()
+        if len(parts) == 3 and parts[1] == 'blob':
+            shas[path] = parts[2]
+    return shas
+
+
+def parse_porcelain(output: str) -> List[List]:
+    """Turn `git blame --porcelain` output into [author, time, line count] runs"""
+
+    commits = {}
+    runs = []
+    current = None
+
+    for line in output.splitlines():
+        if line.startswith('\t'):
+            info = commits[current]
+            if runs and runs[-1][0] == info['author'] and runs[-1][1] == info['time']:
+                runs[-1][2] += 1
+            else:
+                runs.append([info['author'], info['time'], 1])
+            continue
+
+        key, _, value = line.partition(' ')
+        if len(key) == 40 and all(c in '0123456789abcdef' for c in key):
+            current = key
+            commits.setdefault(current, {'author': '', 'time': 0})
+        elif key == 'author':
+            commits[current]['author'] = value
+        elif key == 'author-time':
+            commits[current]['time'] = int(value)
+
+    return runs
+
+
+def blame_file(path: str) -> List[List]:
+    """Blame one file at HEAD"""
+
+    result = subprocess.run(
+        ['git', 'blame', '--porcelain', 'HEAD', '--', path],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return parse_porcelain(result.stdout)
+
+
+def load_cache(cache_path: str) -> Dict[str, List[List]]:
+    """Load cached blame runs keyed by blob SHA"""
+
+    try:
+        with open(cache_path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') == CACHE_VERSION:
+            return data['blobs']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading blame cache: {e}")
+    return {}
+
+
+def save_cache(cache_path: str, blobs: Dict[str, List[List]]):
+    """Save blame runs; only blobs seen this run are kept, so the cache stays bounded"""
+
+    Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'blobs': blobs}, f)
+
+
+def collect_blame(paths: List[str], workers: int = DEFAULT_WORKERS,
+                  cache_path: Optional[str] = DEFAULT_CACHE) -> Tuple[Dict[str, List[List]], Dict]:
+    """Blame the given paths, reusing cached results for unchanged blobs
+
+    Returns the runs per path and cached/blamed counts for run statistics.
+    """
+
+    shas = get_blob_shas(paths)
+    cache = load_cache(cache_path) if cache_path else {}
+
+    blobs = {sha: cache[sha] for sha in set(shas.values()) if sha in cache}
+    misses = sorted({path for path, sha in shas.items() if sha not in blobs})
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for path, runs in zip(misses, pool.map(blame_file, misses)):
+                blobs[shas[path]] = runs
+
+    if cache_path:
+        save_cache(cache_path, blobs)
+
+    stats = {'cached': len(shas) - len(misses), 'blamed': len(misses)}
+    print(f"   Blame: {stats['cached']} cached, {stats['blamed']} blamed")
+    return {path: blobs[sha] for path, sha in shas.items()}, stats
+
+
+def summarize_ownership(runs: List[List], start: int = 1, end: Optional[int] = None,
+                        now: Optional[float] = None) -> Dict:
+    """Summarize authorship of lines start..end (1-based, inclusive)"""
+
+    now = time.time() if now is None else now
+    end = end if end is not None else sum(run[2] for run in runs)
+
+    lines_by_author = {}
+    total_lines = 0
+    total_age = 0.0
+    oldest = 0.0
+
+    line_no = 1
+    for author, timestamp, count in runs:
+        first, last = max(line_no, start), min(line_no + count - 1, end)
+        line_no += count
+        if first > last:
+            continue
+
+        n = last - first + 1
+        age_days = max(now - timestamp, 0) / 86400
+        lines_by_author[author] = lines_by_author.get(author, 0) + n
+        total_lines += n
+        total_age += age_days * n
+        oldest = max(oldest, age_days)
+
+    if not total_lines:
+        return {'authors': 0, 'dominant_author': None, 'dominant_share': 0,
+                'mean_age_days': 0, 'max_age_days': 0}
+
+    dominant, dominant_lines = max(lines_by_author.items(), key=lambda x: (x[1], x[0]))
+    return {
+        'authors': len(lines_by_author),
+        'dominant_author': dominant,
+        'dominant_share': round(dominant_lines / total_lines, 2),
+        'mean_age_days': round(total_age / total_lines, 1),
+        'max_age_days': round(oldest, 1)
+    }
+
+
+def add_ownership(files: Dict[str, Dict], workers: int = DEFAULT_WORKERS,
+                  cache_path: Optional[str] = DEFAULT_CACHE) -> Dict:
+    """Attach ownership metrics to each analyzed file and its functions
+
+    Returns the blame cache statistics (empty when git is unavailable).
+    """
+
+    try:
+        blame, stats = collect_blame([info['path'] for info in files.values()], workers, cache_path)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        print("Not a git repository or git not available, skipping ownership")
+        return {}
+
+    now = time.time()
+    for info in files.values():
+        runs = blame.get(info['path'])
+        if runs is None:
+            continue
+
+        info['ownership'] = summarize_ownership(runs, now=now)
+        for func in info['functions']:
+            func['ownership'] = summarize_ownership(
+                runs, func['line'], func['line'] + func['lines'] - 1, now)
+
+    return stats
@@ -11,16 +11,13 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 
 def read_complexity_report():
-    """Read complexity from radon output"""
+    """Read average complexity from the analyzer's structured report"""
     try:
-        with open('complexity_report.txt', 'r') as f:
-            content = f.read()
-            # Extract average complexity
-            match = re.search(r'Average complexity: \w+ \((\d+\.?\d*)\)', content)
-            if match:
-                return float(match.group(1))
-    except FileNotFoundError:
-        print("⚠️  complexity_report.txt not found, using default")
+        with open('complexity_report.json', 'r') as f:
+            data = json.load(f)
+            return float(data['avg_complexity'])
+    except (FileNotFoundError, KeyError, ValueError):
+        print("⚠️  complexity_report.json not found, using default")
     return 30.0
 
 def read_coverage_report():
@@ -56,6 +53,36 @@ def read_churn_report():
         ]
     return churn_data
 
+def read_hotspots():
+    """Read ranked churn x complexity hotspots from metrics.json"""
+    try:
+        with open('metrics.json', 'r') as f:
+            return json.load(f).get('hotspots', {'files': [], 'functions': []})
+    except (FileNotFoundError, ValueError):
+        print("⚠️  metrics.json not found, skipping hotspots")
+    return {'files': [], 'functions': []}
+
+def read_runtime():
+    """Read the slowest instrumented billing operations from metrics.json"""
+    try:
+        with open('metrics.json', 'r') as f:
+            return json.load(f).get('runtime', {}).get('slowest', [])
+    except (FileNotFoundError, ValueError):
+        print("⚠️  metrics.json not found, skipping runtime latency")
+    return []
+
+def risk_level(changes, score=None):
+    """Return (badge class, label, action) from a hotspot score or raw change count"""
+    if score is not None:
+        high, medium = score >= 50, score >= 20
+    else:
+        high, medium = changes > 40, changes > 20
+    if high:
+        return 'badge-high', 'High', 'Add test coverage, review for stability'
+    if medium:
+        return 'badge-medium', 'Medium', 'Monitor for patterns'
+    return 'badge-low', 'Low', 'Continue monitoring'
+
 def calculate_complexity_trend(current_complexity):
     """Calculate 4-week trend (simplified - in production, store historical data)"""
     # For demo, create a declining trend
@@ -65,7 +92,7 @@ def calculate_complexity_trend(current_complexity):
     week1 = round(week2 + 3)
     return [week1, week2, week3, week4]
 
-def update_dashboard_html(complexity, coverage, churn_data, complexity_trend):
+def update_dashboard_html(complexity, coverage, churn_data, complexity_trend, hotspots, slowest=()):
     """Update the dashboard HTML file with new metrics"""
     
     html_file = 'code_health_dashboard.html'
@@ -100,7 +127,8 @@ def update_dashboard_html(complexity, coverage, churn_data, complexity_trend):
         
         # Update churn table
         soup = BeautifulSoup(content, 'html.parser')
-        tbody = soup.find('tbody')
+        tbody = soup.find('tbody', id='churn-body') or soup.find('tbody')
+        file_scores = {item['file']: item['score'] for item in hotspots['files']}
         
         if tbody and churn_data:
             # Clear existing rows
@@ -110,16 +138,9 @@ def update_dashboard_html(complexity, coverage, churn_data, complexity_trend):
             for item in churn_data:
                 changes = item['changes']
                 
-                # Determine risk level
-                if changes > 40:
-                    risk_badge = '<span class="badge badge-high">High</span>'
-                    action = 'Add test coverage, review for stability'
-                elif changes > 20:
-                    risk_badge = '<span class="badge badge-medium">Medium</span>'
-                    action = 'Monitor for patterns'
-                else:
-                    risk_badge = '<span class="badge badge-low">Low</span>'
-                    action = 'Continue monitoring'
+                # Prefer the hotspot score; fall back to raw change counts
+                badge, label, action = risk_level(changes, file_scores.get(item['file']))
+                risk_badge = f'<span class="badge {badge}">{label}</span>'
                 
                 row = soup.new_tag('tr')
                 row.append(soup.new_tag('td'))
@@ -139,8 +160,59 @@ def update_dashboard_html(complexity, coverage, churn_data, complexity_trend):
                 row.append(td4)
                 
                 tbody.append(row)
+        
+        # Update top risks table
+        risks_body = soup.find('tbody', id='risks-body')
+        if risks_body and hotspots['functions']:
+            risks_body.clear()
+            
+            for item in hotspots['functions']:
+                badge, label, _ = risk_level(item['changes'], item['score'])
+                
+                row = soup.new_tag('tr')
+                row.append(soup.new_tag('td'))
+                row.td.append(soup.new_tag('strong'))
+                row.td.strong.string = item['name']
+                
+                td2 = soup.new_tag('td')
+                td2.string = item['file']
+                row.append(td2)
+                
+                td3 = soup.new_tag('td')
+                td3.append(BeautifulSoup(
+                    f'<span class="badge {badge}">{item["score"]:.1f}</span>', 'html.parser'))
+                row.append(td3)
+                
+                td4 = soup.new_tag('td')
+                td4.string = str(item['complexity'])
+                row.append(td4)
+                
+                td5 = soup.new_tag('td')
+                td5.string = f"{item['coverage']:.0f}%"
+                row.append(td5)
+                
+                risks_body.append(row)
+        
+        # Update slowest operations table
+        slowest_body = soup.find('tbody', id='slowest-body')
+        if slowest_body and slowest:
+            slowest_body.clear()
             
-            content = str(soup)
+            for item in slowest:
+                row = soup.new_tag('tr')
+                name = soup.new_tag('td', attrs={'class': 'operation'})
+                name.string = item['name']
+                row.append(name)
+                
+                for value in (item['kind'], str(item['count']), f"{item['p50_ms']:.2f} ms",
+                              f"{item['p95_ms']:.2f} ms", f"{item['p99_ms']:.2f} ms"):
+                    td = soup.new_tag('td')
+                    td.string = value
+                    row.append(td)
+                
+                slowest_body.append(row)
+        
+        content = str(soup)
         
         # Write updated content
         with open(html_file, 'w', encoding='utf-8') as f:
@@ -151,6 +223,8 @@ def update_dashboard_html(complexity, coverage, churn_data, complexity_trend):
         print(f"   Complexity trend: {complexity_trend}")
         print(f"   Test coverage: {coverage}%")
         print(f"   Code churn entries: {len(churn_data)}")
+        print(f"   Top risks: {len(hotspots['functions'])}")
+        print(f"   Slowest operations: {len(slowest)}")
         
     except FileNotFoundError:
         print(f"❌ Error: {html_file} not found!")
@@ -167,9 +241,11 @@ def main():
     coverage = read_coverage_report()
     churn_data = read_churn_report()
     complexity_trend = calculate_complexity_trend(complexity)
+    hotspots = read_hotspots()
+    slowest = read_runtime()
     
     # Update dashboard
-    update_dashboard_html(complexity, coverage, churn_data, complexity_trend)
+    update_dashboard_html(complexity, coverage, churn_data, complexity_trend, hotspots, slowest)
     
     print("✨ Dashboard update complete!")
 
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "python"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from billing_schema import migrate  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """A migrated billing database of its own for each test."""
+    pool = ConnectionPool(str(tmp_path / "billing.db"))
+    with pool.connection() as conn:
+        migrate(conn)
+    yield pool
+    pool.close()
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from analyze_code_health import analyze_python_files, merge_partials, shard_for_path, write_partial
+
+SOURCES = {
+    "alpha.py": "def a(x):\n    if x:\n        return 1\n    return 0\n",
+    "beta.py": "def b(x):\n    for i in x:\n        if i:\n            return i\n",
+    "gamma.py": "def c():\n    return 3\n\n\ndef d(x):\n    return x or 1\n",
+    "delta.py": "def e(x):\n    while x:\n        x -= 1\n",
+}
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    directory = tmp_path / "python"
+    directory.mkdir()
+    for name, source in SOURCES.items():
+        (directory / name).write_text(source)
+    return directory
+
+
+def write_shards(source_dir, output_dir, count):
+    paths = []
+    for index in range(1, count + 1):
+        analysis = analyze_python_files(str(source_dir), shard=(index, count))
+        paths.append(write_partial(analysis, (index, count), str(output_dir / f"part-{index}-of-{count}.json")))
+    return paths
+
+
+def comparable(analysis):
+    return {key: analysis[key] for key in ("total_complexity", "function_count", "max_complexity",
+                                          "avg_complexity", "files", "high_complexity_functions")}
+
+
+def test_merge_of_all_shards_matches_an_unsharded_run(source_dir, tmp_path):
+    # Neither shard is empty
+    assert len({shard_for_path((source_dir / name).as_posix(), 2) for name in SOURCES}) == 2
+    paths = write_shards(source_dir, tmp_path, 2)
+
+    merged = merge_partials(list(reversed(paths)))
+
+    assert comparable(merged) == comparable(analyze_python_files(str(source_dir)))
+    assert merged["analyzer"]["shards"] == 2
+    assert merged["analyzer"]["files_analyzed"] == len(SOURCES)
+
+
+def test_merge_refuses_a_missing_shard(source_dir, tmp_path):
+    paths = write_shards(source_dir, tmp_path, 3)
+    with pytest.raises(ValueError, match="Missing shard"):
+        merge_partials([paths[0], paths[2]])
+
+
+def test_merge_refuses_a_duplicate_shard(source_dir, tmp_path):
+    paths = write_shards(source_dir, tmp_path, 2)
+    with pytest.raises(ValueError, match="more than once"):
+        merge_partials(paths + [paths[0]])
+
+
+def test_merge_refuses_overlapping_files(source_dir, tmp_path):
+    paths = write_shards(source_dir, tmp_path, 2)
+    with open(paths[0]) as f:
+        first = json.load(f)
+    with open(paths[1]) as f:
+        second = json.load(f)
+    second["files"].update(first["files"])
+    with open(paths[1], "w") as f:
+        json.dump(second, f)
+    with pytest.raises(ValueError, match="more than one shard"):
+        merge_partials(paths)
+
+
+def test_merge_refuses_mixed_shard_counts(source_dir, tmp_path):
+    two = write_shards(source_dir, tmp_path, 2)
+    three = write_shards(source_dir, tmp_path, 3)
+    with pytest.raises(ValueError, match="expected N=2"):
+        merge_partials([two[0], three[1]])
@@ -0,0 +1,20 @@
+import asyncio
+
+from async_billing import AsyncInvoiceDAO
+from invoice_cache import InvoiceSummaryCache
+from invoice_dao import InvoiceDAO
+
+
+def test_summary_miss_and_hit_are_counted_once(pool):
+    dao = InvoiceDAO(pool=pool, summary_cache=InvoiceSummaryCache())
+    dao.create_invoice("c1", 50.0, "pending")
+    async_dao = AsyncInvoiceDAO(dao)
+
+    async def lookups():
+        return [await async_dao.get_invoice_summary("c1") for _ in range(2)]
+
+    first, second = asyncio.run(lookups())
+    assert first == second
+    assert first["outstanding"] == 50.0
+    stats = dao.summary_cache.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 1)
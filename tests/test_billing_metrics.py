@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+
+from billing_metrics import LatencyHistogram, MetricsRegistry, QueryTimer, normalize_sql
+from billing_schema import migrate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def query_series(registry):
+    return {name: stats["count"] for name, stats in registry.snapshot()["queries"].items()}
+
+
+def test_normalize_sql_replaces_literals():
+    assert normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b IN (1, 2.5, NULL) AND c = -3") == \
+        "SELECT * FROM t WHERE a = ? AND b IN (?, ...) AND c = ?"
+
+
+def test_histogram_percentiles_stay_within_a_bucket():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    assert histogram.count == 100
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=0.1)
+    assert histogram.percentile(100) == pytest.approx(0.100)
+
+
+def test_fts_prepare_queries_are_counted_toward_the_next_statement():
+    clock = FakeClock()
+    registry = MetricsRegistry()
+    timer = QueryTimer(registry, clock)
+
+    timer("SELECT 1")
+    clock.now = 1.0
+    timer("PRAGMA 'main'.data_version")
+    clock.now = 1.5
+    timer("SELECT k, v FROM 'main'.'customers_fts_config'")
+    clock.now = 2.0
+    timer("SELECT rowid FROM customers_fts WHERE name LIKE '%ada%'")
+    clock.now = 2.5
+    timer("-- SELECT pgno FROM 'main'.'customers_fts_idx' WHERE segid=?")
+    clock.now = 4.0
+    timer.finish()
+
+    snapshot = registry.snapshot()["queries"]
+    assert set(snapshot) == {"SELECT ?", "SELECT rowid FROM customers_fts WHERE name LIKE ?"}
+    assert snapshot["SELECT ?"]["max_ms"] == 1000.0
+    assert snapshot["SELECT rowid FROM customers_fts WHERE name LIKE ?"]["max_ms"] == 3000.0
+
+
+def test_no_series_for_fts_internal_statements(tmp_path):
+    registry = MetricsRegistry()
+    conn = sqlite3.connect(str(tmp_path / "billing.db"))
+    migrate(conn)
+    conn.execute("INSERT INTO customers (customer_id, name) VALUES ('c1', 'Ada Lovelace')")
+    conn.commit()
+    conn.close()
+
+    # A fresh connection, so FTS5 loads its config on first use
+    conn = sqlite3.connect(str(tmp_path / "billing.db"))
+    timer = QueryTimer(registry)
+    conn.set_trace_callback(timer)
+    conn.execute("SELECT rowid FROM customers_fts WHERE name LIKE '%Lovelace%'").fetchall()
+    conn.execute("UPDATE customers SET name = 'Ada King' WHERE customer_id = 'c1'")
+    conn.commit()
+    timer.finish()
+    conn.close()
+
+    names = set(query_series(registry))
+    assert not any("'main'" in name or "?." in name for name in names)
+    assert "SELECT rowid FROM customers_fts WHERE name LIKE ?" in names
+
+
+def test_executemany_is_recorded_once_per_batch(pool):
+    from billing_metrics import get_registry
+    from notifications import NotificationQueue
+    from payment_processor import PaymentProcessor
+
+    registry = get_registry()
+    if not registry.enabled:
+        pytest.skip("BILLING_METRICS=0")
+    registry.reset()
+    notifications = NotificationQueue()
+    try:
+        processor = PaymentProcessor(pool=pool, notifications=notifications)
+        payments = [(f"c{i}", 10.0, "paypal", {"email": "a@example.com"}) for i in range(1000)]
+        assert all(result.success for result in processor.process_payments(payments, batch_size=500))
+    finally:
+        notifications.shutdown()
+
+    inserts = {name: count for name, count in query_series(registry).items() if name.startswith("INSERT")}
+    assert inserts == {"INSERT INTO payments (customer_id, amount, paypal_email, status) VALUES (?, ...)": 2}
@@ -0,0 +1,35 @@
+import sqlite3
+
+from billing_schema import MIGRATIONS, migrate, schema_version
+from customer_store import SqliteCustomerStore
+from db_pool import ConnectionPool
+
+
+def test_migrate_legacy_customers_table(tmp_path):
+    database = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE customers (customer_id TEXT PRIMARY KEY, name TEXT NOT NULL DEFAULT '', email TEXT)")
+    conn.execute("INSERT INTO customers VALUES ('c1', 'Ada Lovelace', 'ada@example.com')")
+    conn.commit()
+
+    assert migrate(conn) == len(MIGRATIONS)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(customers)")]
+    assert columns == ["customer_id", "name", "email", "phone", "age", "credit_limit",
+                       "status", "created_date", "closed_date", "close_reason"]
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(customers)")}
+    assert {"idx_customers_email", "idx_customers_status_credit"} <= indexes
+    conn.close()
+
+    pool = ConnectionPool(database)
+    try:
+        customer = SqliteCustomerStore(pool).get("c1")
+        assert customer["email"] == "ada@example.com"
+        assert customer["status"] == "active"
+        assert customer["credit_limit"] == 0
+    finally:
+        pool.close()
+
+
+def test_migrate_is_idempotent(pool):
+    with pool.connection() as conn:
+        assert migrate(conn) == schema_version(conn) == len(MIGRATIONS)
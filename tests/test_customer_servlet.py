@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from billing_schema import migrate
+from customer_servlet import CustomerServlet
+from customer_store import SqliteCustomerStore
+from db_pool import IN_CHUNK_SIZE, ConnectionPool
+from invoice_cache import InvoiceSummaryCache
+from invoice_dao import InvoiceDAO
+
+STATUSES = ["pending", "late", "paid", "cancelled"]
+# Enough customers that the batch queries span two IN chunks
+CUSTOMER_COUNT = IN_CHUNK_SIZE + 37
+
+
+def servlet(pool) -> CustomerServlet:
+    # A cache of its own, so batch and single lookups both go to the database
+    return CustomerServlet(store=SqliteCustomerStore(pool),
+                           invoice_dao=InvoiceDAO(pool=pool, summary_cache=InvoiceSummaryCache()))
+
+
+def load(pool):
+    rng = random.Random(32)
+    customers, invoices = [], []
+    for i in range(CUSTOMER_COUNT):
+        customer_id = f"c{i:04d}"
+        customers.append({"customer_id": customer_id, "name": f"Customer {i}",
+                          "age": rng.choice([16, 30, 45, 70]),
+                          "credit_limit": rng.choice([500, 2500, 8000, 9500])})
+        # Some customers have no invoices; the rest a mix of every status
+        for _ in range(rng.choice([0, 1, 3, 6])):
+            invoices.append((customer_id, round(rng.uniform(1, 900), 2), rng.choice(STATUSES)))
+    SqliteCustomerStore(pool).bulk_load(customers)
+    with pool.connection() as conn:
+        conn.executemany("INSERT INTO invoices (customer_id, amount, status) VALUES (?, ?, ?)", invoices)
+    return [customer["customer_id"] for customer in customers] + ["missing"]
+
+
+@pytest.fixture
+def customer_ids(pool):
+    return load(pool)
+
+
+def test_available_credit_many_matches_single(pool, customer_ids):
+    single = {customer_id: servlet(pool).calculate_available_credit(customer_id)
+              for customer_id in customer_ids}
+    assert servlet(pool).calculate_available_credit_many(customer_ids) == single
+    assert len({value for value in single.values()}) > 10
+
+
+def test_outstanding_balances_match_single(pool, customer_ids):
+    dao = servlet(pool).invoice_dao
+    single = {customer_id: dao.get_outstanding_balance(customer_id) for customer_id in customer_ids}
+    assert servlet(pool).get_outstanding_balances(customer_ids) == single
+    assert single["missing"] == 0
+
+
+def test_approve_credit_increases_matches_single(tmp_path, pool, customer_ids):
+    rng = random.Random(33)
+    requests = {customer_id: rng.choice([100, 1500, 6000]) for customer_id in customer_ids}
+
+    other = ConnectionPool(str(tmp_path / "single.db"))
+    try:
+        with other.connection() as conn:
+            migrate(conn)
+        load(other)
+        single_servlet = servlet(other)
+        single = {customer_id: single_servlet.approve_credit_increase(customer_id, increase)
+                  for customer_id, increase in requests.items()}
+
+        batch_servlet = servlet(pool)
+        assert batch_servlet.approve_credit_increases(requests) == single
+        assert True in single.values() and False in single.values()
+
+        limits = {customer_id: customer["credit_limit"]
+                  for customer_id, customer in batch_servlet.store.get_many(customer_ids).items()}
+        assert limits == {customer_id: customer["credit_limit"]
+                          for customer_id, customer in single_servlet.store.get_many(customer_ids).items()}
+    finally:
+        other.close()
@@ -0,0 +1,54 @@
+import pytest
+
+from customer_store import CustomerStore, InMemoryCustomerStore, SqliteCustomerStore
+from db_pool import IN_CHUNK_SIZE
+
+
+def test_bulk_load_keeps_last_duplicate_in_a_batch(pool):
+    customers = [
+        {"customer_id": "n1", "name": "Ada Lovelace", "credit_limit": 100},
+        {"customer_id": "n2", "name": "Alan Turing"},
+        {"customer_id": "n1", "name": "Ada King", "credit_limit": 200},
+    ]
+    sqlite_store = SqliteCustomerStore(pool)
+    memory_store = InMemoryCustomerStore()
+
+    assert sqlite_store.bulk_load(customers) == memory_store.bulk_load(customers) == 2
+    for store in (sqlite_store, memory_store):
+        assert store.get("n1")["name"] == "Ada King"
+        assert store.get("n1")["credit_limit"] == 200
+
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        # Raises if the name index disagrees with the customers table
+        conn.execute("INSERT INTO customers_fts (customers_fts) VALUES ('integrity-check')")
+        names = [row[0] for row in conn.execute(
+            "SELECT c.name FROM customers_fts f JOIN customers c ON c.rowid = f.rowid "
+            "WHERE f.name LIKE '%Ada%'")]
+    assert names == ["Ada King"]
+
+
+def test_bulk_load_same_record_twice(pool):
+    store = SqliteCustomerStore(pool)
+    assert store.bulk_load([{"customer_id": "n1", "name": "A"}, {"customer_id": "n1", "name": "A"}]) == 1
+    assert store.get("n1")["name"] == "A"
+
+
+def test_customer_store_is_abstract():
+    with pytest.raises(TypeError):
+        CustomerStore()
+
+
+def test_get_many_across_chunks_matches_in_memory(pool):
+    customers = [{"customer_id": f"c{i:04d}", "name": f"Customer {i}"} for i in range(IN_CHUNK_SIZE + 20)]
+    sqlite_store = SqliteCustomerStore(pool)
+    memory_store = InMemoryCustomerStore()
+    sqlite_store.bulk_load(customers)
+    memory_store.bulk_load(customers)
+
+    ids = [customer["customer_id"] for customer in customers][::-1] + ["missing", "c0000"]
+    from_sqlite = sqlite_store.get_many(ids)
+    assert len(from_sqlite) == len(customers)
+    assert {customer_id: customer["name"] for customer_id, customer in from_sqlite.items()} == {
+        customer_id: customer["name"] for customer_id, customer in memory_store.get_many(ids).items()}
+
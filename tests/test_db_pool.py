@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from db_pool import IN_CHUNK_SIZE, IN_PLACEHOLDERS, ConnectionPool, in_chunks
+
+
+@pytest.fixture
+def small_pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1, timeout=0.2)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    yield pool
+    pool.close()
+
+
+def rows(pool):
+    with pool.connection() as conn:
+        return [row[0] for row in conn.execute("SELECT x FROM t ORDER BY x")]
+
+
+def test_commits_when_the_block_succeeds(small_pool):
+    with small_pool.connection() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+    # A separate connection sees the row only if it was committed
+    other = sqlite3.connect(small_pool.database)
+    assert other.execute("SELECT x FROM t").fetchall() == [(1,)]
+    other.close()
+
+
+def test_rolls_back_and_returns_the_connection_when_the_block_raises(small_pool):
+    with pytest.raises(ValueError):
+        with small_pool.connection() as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            raise ValueError("boom")
+    # max_size=1: this would time out if the connection hadn't been returned
+    with small_pool.connection() as again:
+        assert again is conn
+        assert not again.in_transaction
+    assert rows(small_pool) == []
+
+
+def test_checkout_times_out_when_exhausted(small_pool):
+    with small_pool.connection():
+        with pytest.raises(TimeoutError):
+            with small_pool.connection():
+                pass
+
+
+def test_closed_pool_refuses_checkouts(small_pool):
+    small_pool.close()
+    with pytest.raises(RuntimeError):
+        with small_pool.connection():
+            pass
+
+
+def test_in_chunks_pads_every_chunk_to_the_placeholder_count():
+    values = [f"c{i}" for i in range(IN_CHUNK_SIZE + 3)]
+    chunks = list(in_chunks(values))
+    assert len(chunks) == 2
+    assert all(len(chunk) == IN_CHUNK_SIZE == IN_PLACEHOLDERS.count("?") for chunk in chunks)
+    assert chunks[0] == values[:IN_CHUNK_SIZE]
+    assert chunks[1] == values[IN_CHUNK_SIZE:] + [None] * (IN_CHUNK_SIZE - 3)
+    assert list(in_chunks([])) == []
+
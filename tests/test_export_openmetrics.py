@@ -0,0 +1,77 @@
+import json
+import os
+
+from export_openmetrics import MetricsSnapshot, render_openmetrics
+
+METRICS = {
+    "timestamp": "2026-01-05T09:00:00",
+    "avg_complexity": 4.2,
+    "max_complexity": 18,
+    "coverage": {"billing": 80, "payments": 65.5},
+    "churn": [{"file": 'python/we"ird\\name.py', "changes": 3}],
+    "hotspots": {"files": [{"file": "python/invoice_dao.py", "score": 71.4}]},
+    "runtime": {"slowest": [{"name": "InvoiceDAO.search_invoices", "kind": "method", "p95_ms": 12.5}]},
+    "analyzer": {"duration_seconds": 1.25, "files_analyzed": 12, "parse_errors": 0,
+                 "blame_cached": 10, "blame_blamed": 2},
+}
+
+
+def test_render_openmetrics():
+    lines = render_openmetrics(METRICS).splitlines()
+
+    assert lines[-1] == "# EOF"
+    assert lines[:3] == ["# TYPE code_health_avg_complexity gauge",
+                         "# HELP code_health_avg_complexity Average cyclomatic complexity per function.",
+                         "code_health_avg_complexity 4.2"]
+    assert "code_health_max_complexity 18" in lines
+    assert 'code_health_coverage_percent{module="payments"} 65.5' in lines
+    assert 'code_health_churn_changes{file="python/we\\"ird\\\\name.py"} 3' in lines
+    assert 'code_health_hotspot_score{file="python/invoice_dao.py"} 71.4' in lines
+    assert ('code_health_runtime_p95_seconds{operation="InvoiceDAO.search_invoices",kind="method"} 0.0125'
+            in lines)
+    assert 'code_health_analyzer_blame_files{source="git"} 2' in lines
+    assert "code_health_analyzer_parse_errors 0" in lines
+    # Every sample belongs to a family declared just before it
+    families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    samples = {line.split("{")[0].split()[0] for line in lines if not line.startswith("#")}
+    assert samples <= set(families)
+    assert len(families) == len(set(families))
+
+
+def test_missing_sections_are_left_out():
+    assert render_openmetrics({}) == "# EOF\n"
+    text = render_openmetrics({"coverage": {}, "timestamp": "not a date", "analyzer": {"shards": 4}})
+    assert text == ("# TYPE code_health_analyzer_shards gauge\n"
+                    "# HELP code_health_analyzer_shards Shards the last run was split into.\n"
+                    "code_health_analyzer_shards 4\n# EOF\n")
+
+
+def test_snapshot_rerenders_only_when_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.json"
+    snapshot = MetricsSnapshot(str(path))
+    assert snapshot.get() == "# EOF\n"
+
+    path.write_text(json.dumps({"max_complexity": 5}))
+    assert "code_health_max_complexity 5" in snapshot.get()
+
+    renders = []
+    monkeypatch.setattr("export_openmetrics.render_openmetrics",
+                        lambda metrics: renders.append(metrics) or "rendered\n")
+    assert "code_health_max_complexity 5" in snapshot.get()
+    assert renders == []
+
+    path.write_text(json.dumps({"max_complexity": 25}))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert snapshot.get() == "rendered\n"
+    assert renders == [{"max_complexity": 25}]
+
+
+def test_snapshot_keeps_serving_through_a_half_written_file(tmp_path):
+    path = tmp_path / "metrics.json"
+    path.write_text(json.dumps({"max_complexity": 5}))
+    snapshot = MetricsSnapshot(str(path))
+    before = snapshot.get()
+
+    path.write_text('{"max_complexity": ')
+    assert snapshot.get() == before
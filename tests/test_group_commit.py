@@ -0,0 +1,104 @@
+import sqlite3
+from concurrent.futures import Future
+
+import pytest
+
+from db_pool import ConnectionPool, DatabaseConfig
+from group_commit import _STOP, GroupCommitWriter
+
+INSERT_SQL = "INSERT INTO payments (customer_id, amount, status) VALUES (?, ?, 'completed')"
+
+
+def customer_ids(pool):
+    with pool.connection() as conn:
+        return sorted(row[0] for row in conn.execute("SELECT customer_id FROM payments"))
+
+
+def test_failing_statement_fails_alone(pool):
+    # The window lets all three writes land in one group
+    writer = GroupCommitWriter(pool, window=0.2)
+    try:
+        good = writer.submit(INSERT_SQL, ("c1", 10.0))
+        bad = writer.submit(INSERT_SQL, (None, 10.0))
+        also_good = writer.submit(INSERT_SQL, ("c2", 10.0))
+        assert good.result(5) and also_good.result(5)
+        with pytest.raises(sqlite3.IntegrityError):
+            bad.result(5)
+    finally:
+        writer.close()
+    assert writer.commits == 1
+    assert writer.writes == 2
+    assert customer_ids(pool) == ["c1", "c2"]
+
+
+def test_failed_begin_fails_the_whole_group(tmp_path):
+    database = str(tmp_path / "billing.db")
+    pool = ConnectionPool(database, config=DatabaseConfig(busy_timeout_ms=50))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE payments (customer_id TEXT, amount REAL, status TEXT)")
+    blocker = sqlite3.connect(database, timeout=0)
+    blocker.execute("BEGIN IMMEDIATE")
+    writer = GroupCommitWriter(pool, window=0.2)
+    try:
+        futures = [writer.submit(INSERT_SQL, (f"c{i}", 10.0)) for i in range(3)]
+        for future in futures:
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                future.result(5)
+    finally:
+        writer.close()
+        blocker.rollback()
+        blocker.close()
+    assert writer.commits == 0
+    assert customer_ids(pool) == []
+    pool.close()
+
+
+def test_failed_commit_fails_every_write_in_the_group(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "billing.db"), max_size=1)
+    with pool.connection() as conn:
+        # A deferred foreign key is only checked at COMMIT
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("CREATE TABLE customers (customer_id TEXT PRIMARY KEY)")
+        conn.execute("""CREATE TABLE payments (
+                            customer_id TEXT REFERENCES customers DEFERRABLE INITIALLY DEFERRED,
+                            amount REAL, status TEXT)""")
+        conn.execute("INSERT INTO customers VALUES ('c1')")
+    writer = GroupCommitWriter(pool, window=0.2)
+    try:
+        good = writer.submit(INSERT_SQL, ("c1", 10.0))
+        orphan = writer.submit(INSERT_SQL, ("missing", 10.0))
+        for future in (good, orphan):
+            with pytest.raises(sqlite3.IntegrityError, match="FOREIGN KEY"):
+                future.result(5)
+    finally:
+        writer.close()
+    assert writer.commits == 0
+    assert customer_ids(pool) == []
+    pool.close()
+
+
+def test_close_commits_writes_already_queued(pool):
+    writer = GroupCommitWriter(pool, window=0.5, max_batch=2)
+    futures = [writer.submit(INSERT_SQL, (f"c{i}", 10.0)) for i in range(5)]
+    writer.close()
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert customer_ids(pool) == [f"c{i}" for i in range(5)]
+    with pytest.raises(RuntimeError):
+        writer.submit(INSERT_SQL, ("c9", 10.0))
+
+
+def test_writes_queued_behind_stop_are_failed(pool):
+    writer = GroupCommitWriter(pool, window=0.5)
+    first = writer.submit(INSERT_SQL, ("c1", 10.0))
+    # While the writer waits out its window, queue a write behind the stop
+    # marker the way an unguarded submit racing close() could
+    late = Future()
+    writer._queue.put(_STOP)
+    writer._queue.put((INSERT_SQL, ("c2", 10.0), late))
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    assert first.result(0)
+    with pytest.raises(RuntimeError, match="closed"):
+        late.result(0)
+    assert customer_ids(pool) == ["c1"]
+
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+import hotspots
+from hotspots import MIN_COVERAGE_GAP, hotspot_scores, rank_hotspots, top_k
+
+NOW = 1_700_000_000.0
+DAY = 86400.0
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Run a test against the NumPy path (when installed) and the pure-Python fallback."""
+    if request.param == "numpy":
+        monkeypatch.setattr(hotspots, "np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(hotspots, "np", None)
+    return request.param
+
+
+def expected_top_k(scores, k):
+    ranked = sorted(range(len(scores)), key=lambda i: (-scores[i], i))[:max(k, 0)]
+    return [i for i in ranked if scores[i] > 0]
+
+
+def expected_scores(churn, complexity, coverage):
+    churn_max, complexity_max = max(churn, default=0), max(complexity, default=0)
+    if churn_max <= 0 or complexity_max <= 0:
+        return [0.0] * len(churn)
+    return [round(100.0 * ch / churn_max * cx / complexity_max * max(1 - cov / 100, MIN_COVERAGE_GAP), 1)
+            for ch, cx, cov in zip(churn, complexity, coverage)]
+
+
+def test_top_k_matches_a_full_sort(backend):
+    rng = random.Random(28)
+    # Few distinct values, so there are ties at every cut-off, plus zeros
+    scores = [rng.choice([0.0, 0.0, 1.5, 7.0, 7.0, 42.0]) for _ in range(200)]
+    for k in (0, 1, 3, 10, 57, 200, 250):
+        assert list(top_k(scores, k)) == expected_top_k(scores, k)
+    assert top_k([], 5) == []
+    assert top_k([0.0, 0.0], 5) == []
+
+
+def test_hotspot_scores_follow_the_formula(backend):
+    rng = random.Random(28)
+    churn = [rng.uniform(0, 5) for _ in range(100)]
+    complexity = [rng.randint(0, 40) for _ in range(100)]
+    coverage = [rng.choice([0, 35, 80, 95, 100]) for _ in range(100)]
+
+    scores = [float(score) for score in hotspot_scores(churn, complexity, coverage)]
+    assert scores == pytest.approx(expected_scores(churn, complexity, coverage), abs=0.051)
+    assert max(scores) <= 100.0
+
+
+def test_hotspot_scores_edge_cases(backend):
+    assert list(hotspot_scores([], [], [])) == []
+    assert list(hotspot_scores([0.0, 0.0], [3, 4], [0, 0])) == [0.0, 0.0]
+    assert list(hotspot_scores([1.0, 2.0], [0, 0], [0, 0])) == [0.0, 0.0]
+    # Fully covered code keeps the minimum coverage gap
+    assert list(hotspot_scores([2.0], [10], [100])) == [100.0 * MIN_COVERAGE_GAP]
+
+
+def test_rank_hotspots(backend):
+    files = {
+        "a.py": {"path": "python/a.py", "complexity": 30,
+                 "functions": [{"name": "big", "complexity": 20, "line": 1},
+                               {"name": "small", "complexity": 10, "line": 40}]},
+        "b.py": {"path": "python/b.py", "complexity": 10,
+                 "functions": [{"name": "only", "complexity": 10, "line": 1}]},
+        "c.py": {"path": "python/c.py", "complexity": 50,
+                 "functions": [{"name": "untouched", "complexity": 50, "line": 1}]},
+    }
+    changes = {"python/a.py": [NOW, NOW - DAY], "python/b.py": [NOW] * 4, "other/x.py": [NOW]}
+    coverage = {"a.py": 50, "b.py": 0}
+
+    ranked = rank_hotspots(files, changes, coverage, k=5, now=NOW)
+
+    assert [item["file"] for item in ranked["files"]] == ["python/b.py", "python/a.py"]
+    assert ranked["files"][0] == {"file": "python/b.py", "score": 20.0, "changes": 4,
+                                  "complexity": 10, "coverage": 0}
+    assert [(item["file"], item["name"]) for item in ranked["functions"]] == [
+        ("python/b.py", "only"), ("python/a.py", "big"), ("python/a.py", "small")]
+    assert ranked["functions"][1]["coverage"] == 50.0
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    numpy = pytest.importorskip("numpy")
+    rng = random.Random(29)
+    churn = [rng.choice([0.0, 0.5, 1.0, 3.0]) for _ in range(500)]
+    complexity = [rng.randint(0, 30) for _ in range(500)]
+    coverage = [rng.choice([0, 50, 90, 100]) for _ in range(500)]
+
+    results = {}
+    for name, module in (("numpy", numpy), ("python", None)):
+        monkeypatch.setattr(hotspots, "np", module)
+        scores = [float(score) for score in hotspot_scores(churn, complexity, coverage)]
+        results[name] = (scores, [int(i) for i in top_k(scores, 25)])
+
+    assert results["numpy"][0] == pytest.approx(results["python"][0], abs=0.051)
+    assert results["numpy"][1] == results["python"][1]
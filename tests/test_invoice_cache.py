@@ -0,0 +1,86 @@
+from db_pool import get_pool
+from invoice_cache import InvoiceSummaryCache
+from invoice_dao import InvoiceDAO
+
+SUMMARY = {"outstanding": 100.0, "used_credit": 100.0, "late_count": 0}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_put_then_get_returns_a_copy():
+    cache = InvoiceSummaryCache()
+    assert cache.put("c1", SUMMARY, cache.token())
+    cached = cache.get("c1")
+    cached["outstanding"] = 0
+    assert cache.get("c1") == SUMMARY
+    assert cache.stats()["hits"] == 2
+
+
+def test_put_refused_when_invalidated_during_the_read():
+    cache = InvoiceSummaryCache()
+    token = cache.token()
+    cache.invalidate("c1")  # a write lands while the reader is querying
+    assert not cache.put("c1", SUMMARY, token)
+    assert cache.get("c1") is None
+    assert cache.put("c1", SUMMARY, cache.token())
+
+
+def test_invalidating_another_customer_does_not_refuse_put():
+    cache = InvoiceSummaryCache()
+    token = cache.token()
+    cache.invalidate("c2")
+    assert cache.put("c1", SUMMARY, token)
+
+
+def test_stale_token_refused_after_invalidation_record_is_evicted():
+    cache = InvoiceSummaryCache(max_size=2)
+    token = cache.token()
+    for customer_id in ("c1", "c2", "c3"):
+        cache.invalidate(customer_id)
+    # c1's invalidation record was dropped; the floor must still cover it
+    assert not cache.put("c1", SUMMARY, token)
+
+
+def test_clear_refuses_reads_started_before_it():
+    cache = InvoiceSummaryCache()
+    token = cache.token()
+    cache.clear()
+    assert not cache.put("c1", SUMMARY, token)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = InvoiceSummaryCache(ttl=30, clock=clock)
+    cache.put("c1", SUMMARY, cache.token())
+    clock.now = 29.9
+    assert cache.get("c1") == SUMMARY
+    clock.now = 30.0
+    assert cache.get("c1") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = InvoiceSummaryCache(max_size=2)
+    cache.put("c1", SUMMARY, cache.token())
+    cache.put("c2", SUMMARY, cache.token())
+    cache.get("c1")
+    cache.put("c3", SUMMARY, cache.token())
+    assert cache.get("c2") is None
+    assert cache.get("c1") == SUMMARY
+    assert cache.stats()["evictions"] == 1
+
+
+def test_daos_on_different_databases_do_not_share_a_cache(tmp_path):
+    a = InvoiceDAO(pool=get_pool(str(tmp_path / "a.db")))
+    b = InvoiceDAO(pool=get_pool(str(tmp_path / "b.db")))
+    assert a.summary_cache is not b.summary_cache
+    assert a.summary_cache is InvoiceDAO(pool=a.pool).summary_cache
+
+    a.create_invoice("c1", 100.0, "pending")
+    assert a.get_outstanding_balance("c1") == 100.0
+    assert b.get_outstanding_balance("c1") == 0
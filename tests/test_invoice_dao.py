@@ -0,0 +1,67 @@
+import invoice_dao
+from db_pool import in_chunks
+from invoice_cache import InvoiceSummaryCache
+from invoice_dao import InvoiceDAO
+
+
+def add_invoices(pool, customers, per_customer=3):
+    with pool.connection() as conn:
+        conn.executemany("INSERT INTO customers (customer_id, name) VALUES (?, ?)", customers)
+        conn.executemany(
+            "INSERT INTO invoices (customer_id, amount, status) VALUES (?, ?, 'pending')",
+            [(customer_id, 10.0 * n) for n in range(1, per_customer + 1) for customer_id, _ in customers])
+
+
+def test_broad_search_falls_back_to_the_same_results(pool, monkeypatch):
+    add_invoices(pool, [(f"c{i}", f"Acme Widgets {i}") for i in range(6)] + [("z1", "Zeta Corp")])
+    dao = InvoiceDAO(pool=pool, summary_cache=InvoiceSummaryCache())
+
+    indexed = list(dao.iter_search_invoices("Widgets", "pending", 0, 100, page_size=4))
+    monkeypatch.setattr(invoice_dao, "MAX_INDEXED_SEARCH_CUSTOMERS", 2)
+    scanned = list(dao.iter_search_invoices("Widgets", "pending", 0, 100, page_size=4))
+
+    assert len(indexed) == 18
+    assert scanned == indexed
+    assert [row.invoice_id for row in indexed] == sorted(row.invoice_id for row in indexed)
+
+
+# sqlite_stat1 of a generated 20k-customer / 100k-invoice database; with
+# these the planner used to walk invoices and probe the FTS table per row
+GENERATED_DB_STATS = [
+    ("invoices", "idx_invoices_customer_created", "100000 6 1"),
+    ("invoices", "idx_invoices_customer_status", "100000 6 3 1"),
+    ("customers", "idx_customers_status_credit", "20000 6667 1112"),
+    ("customers", "idx_customers_email", "20000 1"),
+    ("customers", "sqlite_autoindex_customers_1", "20000 1"),
+    ("customers_fts_data", None, "200"),
+    ("customers_fts_docsize", None, "20000"),
+]
+
+
+def test_indexed_search_is_driven_by_the_name_index_after_analyze(pool):
+    add_invoices(pool, [(f"c{i}", f"Customer {i}") for i in range(50)])
+    with pool.connection() as conn:
+        conn.execute("ANALYZE")
+        conn.execute("DELETE FROM sqlite_stat1")
+        conn.executemany("INSERT INTO sqlite_stat1 VALUES (?, ?, ?)", GENERATED_DB_STATS)
+        conn.commit()
+        conn.execute("ANALYZE sqlite_schema")  # reload the statistics
+        plan = [row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN " + invoice_dao.SEARCH_INVOICES_INDEXED_SQL,
+            ("Customer 1", "pending", 0, 100, -1, 10))]
+
+    assert plan[0].startswith("SEARCH c USING INTEGER PRIMARY KEY (rowid=?)")
+    assert any("customers_fts" in step for step in plan[1:3])
+    assert any(step.startswith("SEARCH i USING COVERING INDEX idx_invoices_customer_status")
+               for step in plan)
+
+
+def test_summary_queries_read_only_the_covering_index(pool):
+    with pool.connection() as conn:
+        plans = [
+            [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + invoice_dao.SUMMARY_SQL, ("c1",))],
+            [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + invoice_dao.SUMMARIES_FOR_CUSTOMERS_SQL,
+                                            next(in_chunks(["c1", "c2"])))],
+        ]
+    for plan in plans:
+        assert plan[0] == "SEARCH invoices USING COVERING INDEX idx_invoices_customer_status (customer_id=?)"
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from invoice_rows import InvoiceRow, InvoiceSearchRow, invoice_row, invoice_search_row
+
+ROW = {"invoice_id": 1, "customer_id": "c1", "amount": 25.0, "status": "pending",
+       "created_date": "2026-01-01 00:00:00"}
+
+
+@pytest.fixture
+def row() -> InvoiceRow:
+    return invoice_row(None, tuple(ROW.values()))
+
+
+def test_row_compares_equal_to_dict(row):
+    assert row == ROW
+    assert ROW == row
+    assert row != {**ROW, "amount": 30.0}
+    assert row == invoice_row(None, tuple(ROW.values()))
+
+
+def test_row_mapping_access(row):
+    assert row["amount"] == row.amount == 25.0
+    assert row.get("status") == "pending"
+    assert row.get("missing") is None
+    assert row.get("missing", 0) == 0
+    assert "customer_id" in row and "missing" not in row
+    assert list(row.items()) == list(ROW.items())
+    assert list(row.keys()) == list(ROW)
+    assert len(row) == len(ROW)
+    with pytest.raises(KeyError):
+        row["missing"]
+
+
+def test_row_serializes_through_to_dict(row):
+    assert json.loads(json.dumps(row.to_dict())) == ROW
+    assert dict(row) == ROW
+    # Documented break from the dict rows these replaced
+    with pytest.raises(TypeError):
+        json.dumps(row)
+
+
+def test_row_is_read_only(row):
+    with pytest.raises(TypeError):
+        row["amount"] = 30.0
+    copy = row.to_dict()
+    copy["amount"] = 30.0
+    assert row["amount"] == 25.0
+
+
+def test_search_row_fields():
+    row = invoice_search_row(None, (7, "c1", "Ada Lovelace", 12.5, "late"))
+    assert isinstance(row, InvoiceSearchRow)
+    assert row.to_dict() == {"invoice_id": 7, "customer_id": "c1", "customer_name": "Ada Lovelace",
+                             "amount": 12.5, "status": "late"}
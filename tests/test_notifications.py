@@ -0,0 +1,40 @@
+import threading
+
+from notifications import NotificationQueue
+
+
+def test_shutdown_during_submit_never_loses_an_accepted_notification():
+    notifications = NotificationQueue(workers=1)
+    delivered = []
+    put = notifications._queue.put
+    shutdown = threading.Thread(target=notifications.shutdown)
+
+    def put_racing_shutdown(item, *args, **kwargs):
+        # Start shutdown after submit's closed check but before its put
+        if isinstance(item, tuple) and not shutdown.ident:
+            shutdown.start()
+            shutdown.join(0.2)
+        return put(item, *args, **kwargs)
+
+    notifications._queue.put = put_racing_shutdown
+    accepted = notifications.submit(delivered.append, "receipt")
+    shutdown.join(5)
+
+    assert accepted
+    assert delivered == ["receipt"]
+    assert notifications.stats()["sent"] == 1
+    assert not notifications.submit(delivered.append, "late")
+
+
+def test_full_queue_drops_and_counts():
+    release = threading.Event()
+    notifications = NotificationQueue(workers=1, max_pending=1, submit_timeout=0.05)
+    try:
+        assert notifications.submit(release.wait)
+        # The worker may or may not have taken the first item yet
+        results = [notifications.submit(lambda: None) for _ in range(2)]
+        assert results.count(False) >= 1
+        assert notifications.stats()["dropped"] == results.count(False)
+    finally:
+        release.set()
+        notifications.shutdown()
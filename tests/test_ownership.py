@@ -0,0 +1,43 @@
+from ownership import parse_porcelain, summarize_ownership
+
+ADA = "a" * 40
+BOB = "b" * 40
+
+
+def header(sha, line, count, author=None, time=None):
+    lines = [f"{sha} {line} {line} {count}" if count else f"{sha} {line} {line}"]
+    if author:
+        lines += [f"author {author}", f"author-mail <{author.lower()}@example.com>",
+                  f"author-time {time}", "author-tz +0000", "committer Someone",
+                  "summary Change things", "filename python/billing.py"]
+    return lines
+
+
+# git blame --porcelain prints a commit's details only the first time it
+# appears; later lines from that commit get just the sha line
+PORCELAIN = "\n".join(
+    header(ADA, 1, 2, "Ada", 1_000) + ["\timport sys"]
+    + header(ADA, 2, None) + ["\tauthor Bob"]
+    + header(BOB, 3, 1, "Bob", 2_000) + [f"\t{ADA} 9 9 1"]
+    + header(ADA, 4, 1) + ["\t"]
+    + header(ADA, 5, None) + ["\treturn 0"]
+) + "\n"
+
+
+def test_parse_porcelain_merges_consecutive_lines_per_commit():
+    assert parse_porcelain(PORCELAIN) == [["Ada", 1_000, 2], ["Bob", 2_000, 1], ["Ada", 1_000, 2]]
+
+
+def test_parse_porcelain_empty_output():
+    assert parse_porcelain("") == []
+
+
+def test_summarize_ownership_of_parsed_runs():
+    runs = parse_porcelain(PORCELAIN)
+    now = 1_000 + 10 * 86400
+
+    assert summarize_ownership(runs, now=now) == {
+        "authors": 2, "dominant_author": "Ada", "dominant_share": 0.8,
+        "mean_age_days": 10.0, "max_age_days": 10.0}
+    assert summarize_ownership(runs, 3, 3, now=now)["dominant_author"] == "Bob"
+    assert summarize_ownership(runs, 9, 12, now=now)["authors"] == 0
@@ -0,0 +1,76 @@
+import pytest
+
+from notifications import NotificationQueue
+from payment_processor import PaymentProcessor
+
+
+@pytest.fixture
+def processor(pool):
+    notifications = NotificationQueue()
+    processor = PaymentProcessor(pool=pool, notifications=notifications)
+    yield processor
+    notifications.shutdown()
+
+
+def paypal(customer_id, amount=10.0):
+    return (customer_id, amount, "paypal", {"email": f"{customer_id}@example.com"})
+
+
+def payment_count(pool):
+    with pool.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0]
+
+
+def test_missing_customer_id_is_rejected(processor, pool):
+    results = processor.process_payments([paypal("c1"), paypal(None)])
+    assert [r.success for r in results] == [True, False]
+    assert results[1].error == "Missing customer ID"
+    assert payment_count(pool) == 1
+
+
+def test_one_failing_row_does_not_fail_the_batch(processor, pool):
+    with pool.connection() as conn:
+        conn.execute("""CREATE TRIGGER reject_bad BEFORE INSERT ON payments
+                        WHEN NEW.customer_id = 'bad'
+                        BEGIN SELECT RAISE(ABORT, 'rejected'); END""")
+    payments = [paypal(f"c{i}") for i in range(5)]
+    payments.insert(2, paypal("bad"))
+
+    results = processor.process_payments(payments)
+
+    assert [r.success for r in results] == [True, True, False, True, True, True]
+    assert "rejected" in results[2].error
+    assert payment_count(pool) == 5
+
+
+def test_malformed_item_fails_alone(processor, pool):
+    results = processor.process_payments([paypal("c1"), ("c2", 10.0, "paypal"), 42, paypal("c3")])
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.success for r in results] == [True, False, False, True]
+    assert results[1].error.startswith("Invalid payment")
+    assert payment_count(pool) == 2
+
+
+def test_processors_share_one_notification_queue(pool):
+    own = NotificationQueue(workers=1)
+    try:
+        assert PaymentProcessor(pool=pool).notifications is PaymentProcessor(pool=pool).notifications
+        assert PaymentProcessor(pool=pool, notifications=own).notifications is own
+    finally:
+        own.shutdown()
+
+
+def test_invalid_items_are_yielded_without_draining_the_input(processor):
+    consumed = 0
+
+    def payments():
+        nonlocal consumed
+        for i in range(5000):
+            consumed += 1
+            yield paypal(None) if i % 100 else paypal(f"c{i}")
+
+    results = processor.iter_process_payments(payments(), batch_size=10)
+    first = next(results)
+    assert first.success
+    assert consumed == 10
+    assert sum(r.success for r in results) == 49